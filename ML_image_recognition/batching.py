@@ -0,0 +1,113 @@
+"""
+Dynamic micro-batching for model inference
+Requests that arrive within a short window are stacked into one batch and
+run in a single forward pass on a background thread; each caller gets its
+own result back through a Future.
+"""
+
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+from metrics import Histogram
+
+
+class QueueFullError(Exception):
+    """Raised when the inference queue is at its configured depth"""
+
+
+class MicroBatcher:
+    """Collects single-image inference requests into batches.
+
+    predict_batch receives a stacked (N, H, W, C) array and must return a
+    list of N results. A batch is flushed once max_batch_size requests are
+    waiting or max_wait_ms has passed since the first one arrived.
+    Its histograms are added to registry, when given, for /metrics.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=16, max_wait_ms=5.0, max_queue=256, registry=None):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        histogram = registry.histogram if registry is not None else Histogram
+        self.queue_wait_ms = histogram(
+            'micro_batch_queue_wait_ms', 'Time images waited for their batch (ms)',
+            buckets=[1, 2, 5, 10, 20, 50, 100, 250, 500, 1000]
+        )
+        self.batch_size = histogram('micro_batch_size', 'Images per forward pass', buckets=[1, 2, 4, 8, 16, 32, 64])
+        self.inference_ms = histogram(
+            'micro_batch_inference_ms', 'Forward pass time per batch (ms)',
+            buckets=[5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+        )
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, image):
+        """Queue one decoded image; returns a Future for its result"""
+        future = Future()
+        try:
+            self._queue.put_nowait((image, future, time.perf_counter()))
+        except queue.Full:
+            raise QueueFullError(f'Inference queue is full ({self._queue.maxsize} waiting)')
+        return future
+
+    def predict(self, image, timeout=None):
+        """Queue one decoded image and wait for its result"""
+        future = self.submit(image)
+        try:
+            return future.result(timeout=timeout)
+        finally:
+            # No-op once finished; drops the request from its batch if the
+            # caller timed out before the batch started
+            future.cancel()
+
+    def stats(self):
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'queue_depth': self._queue.qsize(),
+            'max_queue': self._queue.maxsize,
+            'queue_wait_ms': self.queue_wait_ms.snapshot(),
+            'batch_size': self.batch_size.snapshot(),
+            'inference_ms': self.inference_ms.snapshot()
+        }
+
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is
+        full or the wait window closes"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            for _, _, queued_at in batch:
+                self.queue_wait_ms.observe((started - queued_at) * 1000)
+            self.batch_size.observe(len(batch))
+
+            # Skip requests whose callers already gave up
+            live = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not live:
+                continue
+            try:
+                results = self.predict_batch(np.stack([image for image, _, _ in live]))
+                for (_, future, _), result in zip(live, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future, _ in live:
+                    future.set_exception(e)
+            self.inference_ms.observe((time.perf_counter() - started) * 1000)
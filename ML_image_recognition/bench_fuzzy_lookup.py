@@ -0,0 +1,109 @@
+"""
+Benchmark for fuzzy food-name lookups
+Times NutritionStore.find_fuzzy (trigram candidates + WRatio on the top
+few) on misspelled queries and compares its matches against scoring every
+name in the table, which is what a plain fuzzywuzzy extractOne does.
+
+Usage:
+    python bench_fuzzy_lookup.py --store nutrition_index [--queries 2000] [--compare 200]
+    python bench_fuzzy_lookup.py --rows 300000   # synthetic table in a temp dir
+"""
+import time
+import random
+import argparse
+import tempfile
+
+import numpy as np
+
+from fuzzy_index import similarity
+from nutrition_store import NUTRIENT_COLUMNS, NutritionStore, build_store
+
+WORDS = [
+    "chicken", "curry", "egg", "dal", "toor", "aloo", "paneer", "spinach", "rice", "jeera",
+    "roti", "idli", "dosa", "masala", "poha", "upma", "khichdi", "fish", "fry", "tofu",
+    "beans", "rajma", "apple", "banana", "berry", "smoothie", "salad", "pizza", "burger",
+    "raw", "cooked", "boiled", "fried", "baked", "frozen", "canned", "with", "salt",
+    "without", "skin", "whole", "grain", "milk", "cheese", "yogurt", "butter", "oil",
+]
+
+
+def synthetic_names(count, seed=42):
+    rng = random.Random(seed)
+    return [", ".join(" ".join(rng.sample(WORDS, rng.randint(1, 3))) for _ in range(rng.randint(1, 3)))
+            for _ in range(count)]
+
+
+def misspell(name, rng):
+    """Drop, swap or double a character, like a typo or a class label"""
+    chars = list(name)
+    i = rng.randrange(len(chars))
+    op = rng.choice(("drop", "swap", "double"))
+    if op == "drop" and len(chars) > 3:
+        del chars[i]
+    elif op == "swap" and i + 1 < len(chars):
+        chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    else:
+        chars.insert(i, chars[i])
+    return "".join(chars)
+
+
+def percentiles(samples_ms):
+    return {p: float(np.percentile(samples_ms, p)) for p in (50, 95, 99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", help="Existing nutrition store directory")
+    parser.add_argument("--rows", type=int, default=300000, help="Synthetic table size when no --store is given")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--compare", type=int, default=100,
+                        help="Queries to check against full-table scoring (slow)")
+    args = parser.parse_args()
+
+    if args.store:
+        store = NutritionStore(args.store)
+    else:
+        out_dir = tempfile.mkdtemp(prefix="nutrition_index_")
+        names = synthetic_names(args.rows)
+        start = time.perf_counter()
+        build_store(names, {column: np.zeros(len(names)) for column in NUTRIENT_COLUMNS}, out_dir)
+        print(f"Built synthetic store with {len(names)} rows in {time.perf_counter() - start:.1f}s")
+        store = NutritionStore(out_dir)
+    if store.fuzzy_index is None:
+        raise SystemExit("Store has no trigram index; rebuild it with preprocess_usda.py")
+
+    rng = random.Random(0)
+    queries = [misspell(store.name(rng.randrange(len(store))), rng) for _ in range(args.queries)]
+
+    timings = []
+    matches = []
+    for query in queries:
+        start = time.perf_counter()
+        matches.append(store.find_fuzzy(query))
+        timings.append((time.perf_counter() - start) * 1000)
+    stats = percentiles(timings)
+    print(f"find_fuzzy over {len(store)} rows, {len(queries)} queries: "
+          f"p50 {stats[50]:.2f}ms  p95 {stats[95]:.2f}ms  p99 {stats[99]:.2f}ms")
+
+    # Full-table scoring as the quality reference. Ties are common, so a match
+    # counts as agreeing when it scores as well as the best row overall.
+    names = [store.name(row) for row in range(len(store))]
+    agree = 0
+    full_timings = []
+    checked = queries[:args.compare]
+    for query, row in zip(checked, matches):
+        start = time.perf_counter()
+        best = max(similarity(query, name) for name in names)
+        full_timings.append((time.perf_counter() - start) * 1000)
+        if best < store.fuzzy_min_score:
+            agree += row is None
+        elif row is not None and similarity(query, names[row]) >= best:
+            agree += 1
+    if checked:
+        full = percentiles(full_timings)
+        print(f"full-table scoring, {len(checked)} queries: p50 {full[50]:.1f}ms  p99 {full[99]:.1f}ms")
+        print(f"agreement with full-table best score: {agree}/{len(checked)} ({agree / len(checked):.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Convert the Keras food model into an optimized CPU inference artifact
+and check it still agrees with the original.
+
+Examples:
+    python convert_model.py --format tflite --quantization float16
+    python convert_model.py --format tflite --quantization int8 --samples sample_images/
+    python convert_model.py --format onnx --quantization int8
+
+The artifact is written next to the Keras model by default, where
+INFERENCE_BACKEND=tflite or onnx picks it up. Exits non-zero if top-5
+agreement with the Keras model falls below --tolerance.
+"""
+
+import os
+import sys
+import argparse
+
+import numpy as np
+
+from food_inference import FoodClassifier
+from inference_backends import DEFAULT_MODEL_PATHS, KerasBackend, create_backend
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp')
+
+
+def load_samples(samples_dir, classifier, count):
+    """Decode up to count images from samples_dir into a model input batch,
+    the way the server decodes requests, or random pixels when no directory
+    is given"""
+    if not samples_dir:
+        print("No --samples directory given; validating on random inputs, which is a weak check")
+        batch = classifier.new_batch(count)
+        batch[...] = np.random.default_rng(0).uniform(0, 255, batch.shape)
+        if classifier.input_scale == 'unit':
+            batch /= 255.0
+        return batch
+    paths = sorted(
+        os.path.join(samples_dir, name) for name in os.listdir(samples_dir)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )[:count]
+    if not paths:
+        raise SystemExit(f"No images found in {samples_dir}")
+    batch = classifier.new_batch(len(paths))
+    for i, path in enumerate(paths):
+        with open(path, 'rb') as f:
+            classifier.decode_into(f.read(), batch[i])
+    return batch
+
+
+def convert_tflite(keras_backend, output_path, quantization, samples):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_backend.model)
+    if quantization == 'float16':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == 'int8':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if samples is not None:
+            # Calibrated int8 weights and activations; input and output stay
+            # float32 so the server feeds the same tensors as for Keras
+            def representative_dataset():
+                for image in samples:
+                    yield [image[np.newaxis, ...]]
+            converter.representative_dataset = representative_dataset
+        # Without samples this is dynamic-range quantization (int8 weights)
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+
+
+def convert_onnx(keras_backend, output_path, quantization):
+    import tensorflow as tf
+    import tf2onnx
+
+    if quantization == 'float16':
+        raise SystemExit("float16 is only supported for --format tflite")
+    signature = [tf.TensorSpec([None, *keras_backend.input_shape], tf.float32, name='input')]
+    float_path = output_path if quantization == 'none' else output_path + '.float.onnx'
+    tf2onnx.convert.from_keras(keras_backend.model, input_signature=signature, opset=13, output_path=float_path)
+    if quantization == 'int8':
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(float_path, output_path, weight_type=QuantType.QInt8)
+        os.remove(float_path)
+
+
+def top5_agreement(reference, candidate):
+    """Top-1 match rate and mean top-5 overlap between two probability arrays"""
+    ref_top = np.argsort(reference, axis=1)[:, ::-1][:, :5]
+    cand_top = np.argsort(candidate, axis=1)[:, ::-1][:, :5]
+    top1 = float(np.mean(ref_top[:, 0] == cand_top[:, 0]))
+    overlap = float(np.mean([len(set(r) & set(c)) / 5.0 for r, c in zip(ref_top, cand_top)]))
+    return top1, overlap
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATHS['keras'], help='Keras model to convert')
+    parser.add_argument('--format', choices=['tflite', 'onnx'], default='tflite')
+    parser.add_argument('--quantization', choices=['none', 'float16', 'int8'], default='float16')
+    parser.add_argument('--output', help='Artifact path (default: the backend default next to the model)')
+    parser.add_argument('--samples', help='Directory of food images for int8 calibration and validation')
+    parser.add_argument('--num-samples', type=int, default=64)
+    parser.add_argument('--tolerance', type=float, default=0.95,
+                        help='Minimum mean top-5 overlap with the Keras model (0-1)')
+    args = parser.parse_args()
+
+    output_path = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(args.model)), DEFAULT_MODEL_PATHS[args.format]
+    )
+    keras_backend = KerasBackend(args.model)
+    # Decoded and scaled like requests (MODEL_INPUT_SCALE), so calibration
+    # and validation see what the server feeds the model
+    classifier = FoodClassifier(class_names_path=None, backend=keras_backend)
+    samples = load_samples(args.samples, classifier, args.num_samples)
+
+    print(f"Converting {args.model} to {args.format} ({args.quantization}) -> {output_path}")
+    if args.format == 'tflite':
+        convert_tflite(keras_backend, output_path, args.quantization, samples if args.samples else None)
+    else:
+        convert_onnx(keras_backend, output_path, args.quantization)
+
+    converted = create_backend(args.format, output_path)
+    reference = keras_backend.predict(samples)
+    candidate = converted.predict(samples)
+    top1, overlap = top5_agreement(reference, candidate)
+
+    original_mb = os.path.getsize(args.model) / 1e6
+    converted_mb = os.path.getsize(output_path) / 1e6
+    print(f"Size: {original_mb:.1f}MB -> {converted_mb:.1f}MB")
+    print(f"Agreement on {len(samples)} samples: top-1 {top1:.3f}, top-5 overlap {overlap:.3f} (tolerance {args.tolerance})")
+
+    if overlap < args.tolerance:
+        print("Converted model disagrees with the Keras model beyond tolerance")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,31 +3,153 @@ Flask API Server for Food Recognition
 Serves the ML models for food recognition via HTTP API
 """
 
+import time
+_import_started = time.perf_counter()
+
 import os
-import json
 import base64
-from io import BytesIO
-from PIL import Image
-import numpy as np
-from flask import Flask, request, jsonify
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, g, has_request_context, request, jsonify
 from flask_cors import CORS
-import tensorflow as tf
 
-# Import our existing food recognition modules
-from enhanced_food_recognition import EnhancedFoodRecognizer
-from nutritionix_adapter import NutritionixAdapter
+# The model's runtime, PIL (through food_inference) and
+# EnhancedFoodRecognizer are imported when the model loads, after any fork;
+# the pandas-backed NutritionixAdapter on the first lookup that needs it
+from batching import MicroBatcher, QueueFullError
+from nutrition_store import NutritionStore
+from metrics import HttpMetrics, Registry, RequestStages
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for Flutter app
+CORS(app, expose_headers=['Server-Timing'])  # Enable CORS for Flutter app
+
+# Prometheus-style metrics served at /metrics; every response also carries
+# a Server-Timing header with its decode/preprocess/inference/nutrition times
+metrics_registry = Registry()
+http_metrics = HttpMetrics(metrics_registry)
+stage_seconds = metrics_registry.histogram(
+    'recognition_stage_seconds',
+    'Time per stage: decode, preprocess, inference, nutrition_lookup',
+    ('stage',)
+)
+
+# "keras", "tflite" and "onnx" run the custom model in-process on decoded
+# image buffers (see convert_model.py for the tflite/onnx artifacts);
+# "recognizer" goes through EnhancedFoodRecognizer and its file-based predict.
+# The recognizer stays the default until tests/test_backend_parity.py passes
+# for the deployed model and images.
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'recognizer').lower()
+MODEL_PATH = os.getenv('MODEL_PATH')  # defaults to the backend's artifact
+CLASS_NAMES_PATH = os.getenv('CLASS_NAMES_PATH', 'class_names.json')
+
+# Micro-batching of concurrent predictions (in-process backends only)
+ENABLE_MICRO_BATCHING = os.getenv('ENABLE_MICRO_BATCHING', 'true').lower() in ('1', 'true', 'yes')
+MICRO_BATCH_MAX_SIZE = int(os.getenv('MICRO_BATCH_MAX_SIZE', '16'))
+MICRO_BATCH_MAX_WAIT_MS = float(os.getenv('MICRO_BATCH_MAX_WAIT_MS', '5'))
+MICRO_BATCH_QUEUE_DEPTH = int(os.getenv('MICRO_BATCH_QUEUE_DEPTH', '256'))
+PREDICT_TIMEOUT = float(os.getenv('PREDICT_TIMEOUT', '30'))
+
+# Startup: batch sizes run once to warm the inference graph, and whether a
+# failed model load should stop the server instead of serving fallbacks.
+# The default covers every power of two up to the micro-batch size, which
+# is one interpreter each for the TFLite backend.
+_default_warmup_sizes = sorted({1 << i for i in range(MICRO_BATCH_MAX_SIZE.bit_length())} | {MICRO_BATCH_MAX_SIZE})
+WARMUP_BATCH_SIZES = [int(size) for size in os.getenv('WARMUP_BATCH_SIZES', ','.join(map(str, _default_warmup_sizes))).split(',') if size.strip()]
+REQUIRE_MODEL = os.getenv('REQUIRE_MODEL', 'false').lower() in ('1', 'true', 'yes')
+# When each process loads the model:
+#   background - serve at once and load in a thread; predictions wait for it (default)
+#   warm - load before serving, for warm pools and pre-initialized snapshots
+#   lazy - load on the first prediction request
+STARTUP_MODE = os.getenv('STARTUP_MODE', 'background').lower()
+
+# Prebuilt nutrition index (see nutrition_store.py); the pandas-backed
+# NutritionixAdapter is only loaded when it is missing
+NUTRITION_STORE_PATH = os.getenv('NUTRITION_STORE_PATH', 'nutrition_index')
+
+# /predict_batch limits and the pool that decodes its images in parallel
+PREDICT_BATCH_MAX_IMAGES = int(os.getenv('PREDICT_BATCH_MAX_IMAGES', '32'))
+DECODE_WORKERS = int(os.getenv('DECODE_WORKERS', str(os.cpu_count() or 4)))
+decode_pool = ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix='decode')
 
 # Initialize the food recognizer and nutrition adapter
+food_classifier = None
 food_recognizer = None
-nutrition_adapter = NutritionixAdapter()
+micro_batcher = None
+# Held while the model loads, so requests wait for a load in progress
+model_lock = threading.Lock()
+model_load_attempted = False
+
+# Filled in by startup(); served by /ready
+readiness = {
+    'ready': False,
+    'startup_mode': STARTUP_MODE,
+    'import_seconds': None,
+    'backend': None,
+    'load_seconds': None,
+    'warmup_seconds': None,
+    'error': None
+}
+nutrition_store = None
+nutrition_adapter = None
+nutrition_adapter_lock = threading.Lock()
+
+def initialize_nutrition():
+    """Open the memory-mapped nutrition store; without one, lookups fall
+    back to the adapter, which get_nutrition_adapter() loads on first use"""
+    global nutrition_store
+    if os.path.isdir(NUTRITION_STORE_PATH):
+        try:
+            start = time.perf_counter()
+            nutrition_store = NutritionStore(NUTRITION_STORE_PATH)
+            print(f"Nutrition store opened: {len(nutrition_store)} rows in {(time.perf_counter() - start) * 1000:.1f}ms")
+        except Exception as e:
+            print(f"Error opening nutrition store: {e}")
+            nutrition_store = None
+
+def get_nutrition_adapter():
+    """The NutritionixAdapter, loaded by the first lookup that needs it"""
+    global nutrition_adapter
+    if nutrition_adapter is None:
+        with nutrition_adapter_lock:
+            if nutrition_adapter is None:
+                from nutritionix_adapter import NutritionixAdapter
+                nutrition_adapter = NutritionixAdapter()
+    return nutrition_adapter
+
+# Opened at import so pre-forked workers share the mapped pages
+initialize_nutrition()
+
+def decode_base64_image(image_data):
+    """Decode a base64 image string, with or without a data URL prefix"""
+    if image_data.startswith('data:image'):
+        image_data = image_data.split(',', 1)[1]
+    return base64.b64decode(image_data)
 
 def initialize_model():
     """Initialize the food recognition model"""
-    global food_recognizer
+    global food_classifier, food_recognizer, micro_batcher
+    if INFERENCE_BACKEND != 'recognizer':
+        try:
+            from food_inference import FoodClassifier
+            food_classifier = FoodClassifier(MODEL_PATH, CLASS_NAMES_PATH, backend=INFERENCE_BACKEND)
+            print(f"Food classifier initialized successfully ({INFERENCE_BACKEND} backend)")
+            if ENABLE_MICRO_BATCHING:
+                micro_batcher = MicroBatcher(
+                    food_classifier.predict_batch,
+                    max_batch_size=MICRO_BATCH_MAX_SIZE,
+                    max_wait_ms=MICRO_BATCH_MAX_WAIT_MS,
+                    max_queue=MICRO_BATCH_QUEUE_DEPTH,
+                    registry=metrics_registry
+                )
+                print(f"Micro-batching enabled (max batch {MICRO_BATCH_MAX_SIZE}, max wait {MICRO_BATCH_MAX_WAIT_MS:g}ms)")
+            return True
+        except Exception as e:
+            print(f"Error initializing in-memory classifier: {e}")
+            print("Falling back to EnhancedFoodRecognizer")
+            food_classifier = None
     try:
+        from enhanced_food_recognition import EnhancedFoodRecognizer
         food_recognizer = EnhancedFoodRecognizer(model_type='efficientnet', use_custom_model=True)
         print("Food recognizer initialized successfully")
         return True
@@ -37,24 +159,247 @@ def initialize_model():
         food_recognizer = None
         return False
 
+def startup():
+    """Load the model and warm it up before taking traffic.
+
+    /ready reports 503 until this has finished successfully.
+    """
+    readiness['ready'] = False
+    start = time.perf_counter()
+    loaded = initialize_model()
+    readiness['load_seconds'] = round(time.perf_counter() - start, 3)
+
+    if not loaded:
+        readiness['error'] = 'Model failed to load'
+        if REQUIRE_MODEL:
+            raise RuntimeError("Food recognition model failed to load and REQUIRE_MODEL is set")
+        return False
+
+    readiness['backend'] = food_classifier.backend.name if food_classifier is not None else 'recognizer'
+    if food_classifier is not None:
+        try:
+            readiness['warmup_seconds'] = round(food_classifier.warm_up(WARMUP_BATCH_SIZES), 3)
+            print(f"Model warmed up in {readiness['warmup_seconds']}s (batch sizes {WARMUP_BATCH_SIZES})")
+        except Exception as e:
+            readiness['error'] = f'Warm-up failed: {e}'
+            if REQUIRE_MODEL:
+                raise
+            return False
+
+    readiness['error'] = None
+    readiness['ready'] = True
+    return True
+
+def load_model_once():
+    """Run startup() unless it has already run in this process; callers
+    that arrive while it is running wait for it to finish"""
+    global model_load_attempted
+    if model_load_attempted:
+        return
+    with model_lock:
+        if model_load_attempted:
+            return
+        try:
+            startup()
+        finally:
+            model_load_attempted = True
+
+def _load_model_in_background():
+    try:
+        load_model_once()
+    except Exception as e:
+        # Only reached with REQUIRE_MODEL; stop the process like a failed warm start
+        print(f"Model load failed: {e}")
+        os._exit(1)
+
+def start_model_loading():
+    """Load the model per STARTUP_MODE; call once per process, after any fork"""
+    if STARTUP_MODE == 'warm':
+        load_model_once()
+    elif STARTUP_MODE == 'background':
+        threading.Thread(target=_load_model_in_background, name='model-loader', daemon=True).start()
+
+def predict_images(images_bytes):
+    """Predict a list of images, returning (predictions, error) per image.
+
+    With the in-memory classifier the images are decoded in parallel into
+    one input batch and run in a single forward pass.
+    """
+    if food_classifier is None:
+        results = []
+        for image_bytes in images_bytes:
+            try:
+                results.append((predict_image(image_bytes), None))
+            except Exception as e:
+                results.append((None, str(e)))
+        return results
+
+    stages = current_stages()
+    batch = food_classifier.new_batch(len(images_bytes))
+    with stages.time('preprocess'):
+        decoded = list(decode_pool.map(
+            lambda item: _decode_slot(item[1], batch[item[0]]),
+            enumerate(images_bytes)
+        ))
+    good = [i for i, error in enumerate(decoded) if error is None]
+    results = [(None, error) for error in decoded]
+    if good:
+        model_input = batch if len(good) == len(images_bytes) else batch[good]
+        with stages.time('inference'):
+            predictions_batch = food_classifier.predict_batch(model_input)
+        for index, predictions in zip(good, predictions_batch):
+            results[index] = (predictions, None)
+    return results
+
+def _decode_slot(image_bytes, slot):
+    """Decode into one row of a batch, returning an error message or None"""
+    try:
+        food_classifier.decode_into(image_bytes, slot)
+        return None
+    except Exception as e:
+        return f'Could not decode image: {e}'
+
+def format_predictions(predictions):
+    """Top-5 predictions in the response format"""
+    formatted_predictions = []
+    for pred in predictions[:5]:
+        formatted_predictions.append({
+            'name': pred.get('display_name', pred.get('class_name', 'Unknown')),
+            'confidence': pred.get('probability', 0.0),
+            'is_custom_model': pred.get('is_custom', False)
+        })
+    return formatted_predictions
+
+def lookup_nutrition(food_name):
+    """Nutrition for a food name as a dict, or None if not found"""
+    if not food_name:
+        return None
+    with current_stages().time('nutrition_lookup'):
+        if nutrition_store is not None:
+            return nutrition_store.get(food_name)
+        nutrition_raw = get_nutrition_adapter().get_nutrition(food_name)
+    if nutrition_raw is not None and not nutrition_raw.empty:
+        return nutrition_raw.to_dict()
+    return None
+
+def busy_response(e):
+    """503 telling the client to retry when the inference queue is full"""
+    response = jsonify({'error': str(e)})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+def current_stages():
+    """This request's stage recorder, or a detached one outside a request"""
+    if has_request_context() and 'stages' in g:
+        return g.stages
+    return RequestStages(stage_seconds)
+
+@app.before_request
+def start_request_metrics():
+    g.stages = RequestStages(stage_seconds)
+    g.request_start = time.perf_counter()
+    http_metrics.in_flight.inc()
+
+@app.after_request
+def record_request_metrics(response):
+    # Runs for error responses too, including unhandled exceptions
+    if 'request_start' in g and request.path != '/metrics':
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_metrics.requests.inc(method=request.method, route=route, status=str(response.status_code))
+        if response.status_code >= 500:
+            http_metrics.errors.inc(method=request.method, route=route)
+        http_metrics.duration.observe(time.perf_counter() - g.request_start, method=request.method, route=route)
+        header = g.stages.server_timing()
+        if header:
+            response.headers['Server-Timing'] = header
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    if 'request_start' in g:
+        http_metrics.in_flight.dec()
+
+def model_loaded():
+    """Whether any recognition backend is available"""
+    return food_classifier is not None or food_recognizer is not None
+
+def predict_image(image_bytes):
+    """Predict food from image bytes held in memory"""
+    stages = current_stages()
+    if food_classifier is not None:
+        with stages.time('preprocess'):
+            batch = food_classifier.decode(image_bytes)
+        # With micro-batching this includes the wait for the batch, which
+        # /batching/stats and the micro_batch_* metrics break down further
+        with stages.time('inference'):
+            if micro_batcher is not None:
+                # Decoded on the request thread, forward pass batched
+                return micro_batcher.predict(batch[0], timeout=PREDICT_TIMEOUT)
+            return food_classifier.predict_batch(batch)[0]
+
+    # EnhancedFoodRecognizer (not part of this service) only has
+    # predict(path), so its fallback path needs the image on disk; a private
+    # temp file per request keeps concurrent requests from overwriting each
+    # other's image. The FoodClassifier backends decode from memory.
+    fd, temp_image_path = tempfile.mkstemp(suffix='.jpg')
+    try:
+        with stages.time('preprocess'):
+            with os.fdopen(fd, 'wb') as f:
+                f.write(image_bytes)
+        with stages.time('inference'):
+            return food_recognizer.predict(temp_image_path)
+    finally:
+        os.remove(temp_image_path)
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
-        'model_loaded': food_recognizer is not None
+        'model_loaded': model_loaded()
     })
 
+@app.route('/ready', methods=['GET'])
+def ready_check():
+    """Readiness for load balancers: 200 only once the model is loaded and
+    warm. In lazy mode the first prediction loads it, so 200 until a load fails."""
+    if STARTUP_MODE == 'lazy' and not model_load_attempted:
+        return jsonify(readiness), 200
+    status = 200 if readiness['ready'] else 503
+    return jsonify(readiness), status
+
+@app.route('/batching/stats', methods=['GET'])
+def batching_stats():
+    """Micro-batching queue depth plus queue-wait, batch-size and inference histograms"""
+    if micro_batcher is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **micro_batcher.stats()})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint"""
+    # The micro-batcher's histograms are registered in metrics_registry
+    text = metrics_registry.render()
+    if micro_batcher is not None:
+        text += (
+            f"# HELP micro_batch_queue_depth Images waiting for a batch\n"
+            f"# TYPE micro_batch_queue_depth gauge\n"
+            f"micro_batch_queue_depth {micro_batcher.stats()['queue_depth']}\n"
+        )
+    return Response(text, mimetype='text/plain; version=0.0.4')
+
 @app.route('/predict', methods=['POST'])
 def predict_food():
     """Predict food from uploaded image"""
     try:
         # Get image data from request
-        data = request.get_json()
-        if 'image' not in data:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or 'image' not in data:
             return jsonify({'error': 'No image data provided'}), 400
         
-        if food_recognizer is None:
+        load_model_once()
+        if not model_loaded():
             # Return fallback predictions when model is not loaded
             return jsonify({
                 'success': True,
@@ -64,43 +409,22 @@ def predict_food():
                     {'name': 'Rice Dish', 'confidence': 0.5, 'is_custom_model': False},
                     {'name': 'Curry', 'confidence': 0.4, 'is_custom_model': False},
                     {'name': 'Vegetable Dish', 'confidence': 0.3, 'is_custom_model': False}
-                ]
+                ],
+                'is_fallback': True
             })
         
-        # Decode base64 image
-        image_data = data['image']
-        if image_data.startswith('data:image'):
-            # Remove data URL prefix
-            image_data = image_data.split(',')[1]
-        
-        # Decode and save image temporarily
-        image_bytes = base64.b64decode(image_data)
-        temp_image_path = 'temp_image.jpg'
-        
-        with open(temp_image_path, 'wb') as f:
-            f.write(image_bytes)
-        
-        # Make prediction
-        predictions = food_recognizer.predict(temp_image_path)
-        
-        # Clean up temporary file
-        if os.path.exists(temp_image_path):
-            os.remove(temp_image_path)
-        
-        # Format response
-        formatted_predictions = []
-        for pred in predictions[:5]:  # Return top 5 predictions
-            formatted_predictions.append({
-                'name': pred.get('display_name', pred.get('class_name', 'Unknown')),
-                'confidence': pred.get('probability', 0.0),
-                'is_custom_model': pred.get('is_custom', False)
-            })
+        # Decode base64 image and predict from memory
+        with current_stages().time('decode'):
+            image_bytes = decode_base64_image(data['image'])
+        predictions = predict_image(image_bytes)
         
         return jsonify({
             'success': True,
-            'predictions': formatted_predictions
+            'predictions': format_predictions(predictions)  # Return top 5 predictions
         })
         
+    except QueueFullError as e:
+        return busy_response(e)
     except Exception as e:
         print(f"Error in prediction: {e}")
         return jsonify({'error': str(e)}), 500
@@ -109,20 +433,17 @@ def predict_food():
 def get_nutrition():
     """Get nutrition information for a food item"""
     try:
-        data = request.get_json()
-        if 'food_name' not in data:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or 'food_name' not in data:
             return jsonify({'error': 'No food name provided'}), 400
         
         food_name = data['food_name']
         quantity = data.get('quantity', 100)  # Default to 100g
         
         # Get nutrition data
-        nutrition_data = nutrition_adapter.get_nutrition(food_name)
+        nutrition_dict = lookup_nutrition(food_name)
         
-        if nutrition_data is not None and not nutrition_data.empty:
-            # Convert pandas Series to dictionary
-            nutrition_dict = nutrition_data.to_dict()
-            
+        if nutrition_dict is not None:
             # Scale nutrition data based on quantity
             scale_factor = quantity / 100.0  # Assuming base data is per 100g
             
@@ -149,30 +470,18 @@ def get_nutrition():
 def predict_with_nutrition():
     """Predict food and get nutrition information in one call"""
     try:
-        if food_recognizer is None:
+        load_model_once()
+        if not model_loaded():
             return jsonify({'error': 'Model not loaded'}), 500
         
-        data = request.get_json()
-        if 'image' not in data:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or 'image' not in data:
             return jsonify({'error': 'No image data provided'}), 400
         
-        # Decode base64 image
-        image_data = data['image']
-        if image_data.startswith('data:image'):
-            image_data = image_data.split(',')[1]
-        
-        image_bytes = base64.b64decode(image_data)
-        temp_image_path = 'temp_image.jpg'
-        
-        with open(temp_image_path, 'wb') as f:
-            f.write(image_bytes)
-        
-        # Make prediction
-        predictions = food_recognizer.predict(temp_image_path)
-        
-        # Clean up temporary file
-        if os.path.exists(temp_image_path):
-            os.remove(temp_image_path)
+        # Decode base64 image and predict from memory
+        with current_stages().time('decode'):
+            image_bytes = decode_base64_image(data['image'])
+        predictions = predict_image(image_bytes)
         
         # Get nutrition for top prediction
         top_prediction = None
@@ -181,26 +490,11 @@ def predict_with_nutrition():
         if predictions:
             top_prediction = predictions[0]
             food_name = top_prediction.get('display_name', top_prediction.get('class_name', ''))
-            
-            if food_name:
-                nutrition_raw = nutrition_adapter.get_nutrition(food_name)
-                if nutrition_raw is not None and not nutrition_raw.empty:
-                    nutrition_data = nutrition_raw.to_dict()
-                else:
-                    nutrition_data = None
-        
-        # Format response
-        formatted_predictions = []
-        for pred in predictions[:5]:
-            formatted_predictions.append({
-                'name': pred.get('display_name', pred.get('class_name', 'Unknown')),
-                'confidence': pred.get('probability', 0.0),
-                'is_custom_model': pred.get('is_custom', False)
-            })
+            nutrition_data = lookup_nutrition(food_name)
         
         return jsonify({
             'success': True,
-            'predictions': formatted_predictions,
+            'predictions': format_predictions(predictions),
             'top_prediction': {
                 'name': top_prediction.get('display_name', '') if top_prediction else '',
                 'confidence': top_prediction.get('probability', 0.0) if top_prediction else 0.0,
@@ -208,11 +502,87 @@ def predict_with_nutrition():
             }
         })
         
+    except QueueFullError as e:
+        return busy_response(e)
     except Exception as e:
         print(f"Error in prediction with nutrition: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    """Predict several images in one call, with nutrition for each top prediction"""
+    try:
+        load_model_once()
+        if not model_loaded():
+            return jsonify({'error': 'Model not loaded'}), 500
+        
+        data = request.get_json(silent=True)
+        images = data.get('images') if isinstance(data, dict) else None
+        if not images or not isinstance(images, list):
+            return jsonify({'error': 'No images provided'}), 400
+        if len(images) > PREDICT_BATCH_MAX_IMAGES:
+            return jsonify({'error': f'Too many images: max {PREDICT_BATCH_MAX_IMAGES}'}), 413
+        
+        images_bytes = []
+        decode_errors = {}
+        with current_stages().time('decode'):
+            for index, image_data in enumerate(images):
+                try:
+                    images_bytes.append(decode_base64_image(image_data))
+                except Exception as e:
+                    decode_errors[index] = f'Invalid base64 image: {e}'
+                    images_bytes.append(b'')
+        
+        outcomes = predict_images([b for i, b in enumerate(images_bytes) if i not in decode_errors])
+        outcomes_iter = iter(outcomes)
+        
+        # Several photos of the same dish only need one nutrition lookup
+        nutrition_cache = {}
+        results = []
+        for index in range(len(images)):
+            if index in decode_errors:
+                results.append({'index': index, 'success': False, 'error': decode_errors[index]})
+                continue
+            predictions, error = next(outcomes_iter)
+            if error is not None:
+                results.append({'index': index, 'success': False, 'error': error})
+                continue
+            
+            top_prediction = predictions[0] if predictions else None
+            nutrition_data = None
+            if top_prediction:
+                food_name = top_prediction.get('display_name', top_prediction.get('class_name', ''))
+                if food_name not in nutrition_cache:
+                    nutrition_cache[food_name] = lookup_nutrition(food_name)
+                nutrition_data = nutrition_cache[food_name]
+            
+            results.append({
+                'index': index,
+                'success': True,
+                'predictions': format_predictions(predictions),
+                'top_prediction': {
+                    'name': top_prediction.get('display_name', '') if top_prediction else '',
+                    'confidence': top_prediction.get('probability', 0.0) if top_prediction else 0.0,
+                    'nutrition': nutrition_data
+                }
+            })
+        
+        return jsonify({
+            'success': all(result['success'] for result in results),
+            'results': results
+        })
+        
+    except Exception as e:
+        print(f"Error in batch prediction: {e}")
+        return jsonify({'error': str(e)}), 500
+
+readiness['import_seconds'] = round(time.perf_counter() - _import_started, 3)
+
 if __name__ == '__main__':
-    print("Starting Food Recognition API Server...")
-    initialize_model()
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Single-process development server; for production use
+    #   gunicorn -c gunicorn.conf.py flask_api:app
+    print(f"Starting Food Recognition API Server ({STARTUP_MODE} startup, imported in {readiness['import_seconds']}s)...")
+    start_model_loading()
+    debug = os.getenv('FLASK_DEBUG', 'false').lower() in ('1', 'true', 'yes')
+    # The reloader would load the model a second time in a child process
+    app.run(host='0.0.0.0', port=5000, debug=debug, use_reloader=False)
@@ -0,0 +1,115 @@
+"""
+In-memory inference for the custom food model
+Decodes request images straight from bytes into the model's input batch,
+so predictions never touch the filesystem and concurrent requests can't
+see each other's images.
+"""
+
+import os
+import json
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from inference_backends import create_backend
+
+DEFAULT_CLASS_NAMES_PATH = 'class_names.json'
+
+
+def load_class_names(path):
+    """Class names as a list indexed by model output, from a JSON list or
+    an {index: name} mapping"""
+    with open(path, 'r') as f:
+        names = json.load(f)
+    if isinstance(names, dict):
+        return [names[key] for key in sorted(names, key=lambda k: int(k))]
+    return list(names)
+
+
+def display_name(class_name):
+    """Human-readable label for a class name like 'chicken_curry'"""
+    return class_name.replace('_', ' ').strip().title()
+
+
+class FoodClassifier:
+    """Food model with an in-memory decode path, on any inference backend.
+
+    Input scaling defaults to raw 0-255 pixels, which is what the Keras
+    EfficientNet models expect (they rescale internally); set
+    MODEL_INPUT_SCALE=unit for models trained on 0-1 inputs. Whether the
+    decode and preprocessing match EnhancedFoodRecognizer is checked by
+    tests/test_backend_parity.py against the deployed model.
+    """
+
+    def __init__(self, model_path=None, class_names_path=DEFAULT_CLASS_NAMES_PATH, input_scale=None, backend='keras'):
+        # A backend name, or an already loaded backend (see convert_model.py)
+        self.backend = create_backend(backend, model_path) if isinstance(backend, str) else backend
+        # Without class names, predictions are labelled by output index
+        self.class_names = load_class_names(class_names_path) if class_names_path else []
+        height, width, channels = self.backend.input_shape
+        self.input_size = (int(width), int(height))
+        self.channels = int(channels or 3)
+        self.input_scale = (input_scale or os.getenv('MODEL_INPUT_SCALE', 'raw')).lower()
+
+    def warm_up(self, batch_sizes=(1,)):
+        """Trace the inference graph and run each batch size once so the
+        first real request runs at steady-state speed. Returns seconds taken."""
+        start = time.perf_counter()
+        for size in batch_sizes:
+            self.predict_batch(np.zeros_like(self.new_batch(size)))
+        return time.perf_counter() - start
+
+    def decode_into(self, image_bytes, out):
+        """Decode image bytes directly into a preallocated (H, W, C) slot"""
+        image = Image.open(BytesIO(image_bytes))
+        # Let the JPEG decoder downscale while decoding instead of
+        # producing a full-size bitmap and shrinking it afterwards. Phone
+        # photos are often stored sideways with an EXIF orientation, so the
+        # draft size must hold either way round until that is applied.
+        side = max(self.input_size)
+        image.draft('RGB', (side, side))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGB')
+        if image.size != self.input_size:
+            image = image.resize(self.input_size, Image.BILINEAR)
+        out[...] = np.asarray(image, dtype=np.float32)
+        if self.input_scale == 'unit':
+            out /= 255.0
+        return out
+
+    def new_batch(self, size):
+        """Empty float32 input batch for size images"""
+        width, height = self.input_size
+        return np.empty((size, height, width, self.channels), dtype=np.float32)
+
+    def decode(self, image_bytes):
+        """Decode one image into a single-image input batch"""
+        batch = self.new_batch(1)
+        self.decode_into(image_bytes, batch[0])
+        return batch
+
+    def predict_batch(self, batch, top_k=5):
+        """Run one forward pass over an input batch, returning top_k
+        predictions per image"""
+        probabilities = self.backend.predict(batch)
+        return [self.format_predictions(row, top_k) for row in probabilities]
+
+    def format_predictions(self, probabilities, top_k=5):
+        """Top-k predictions in the same shape EnhancedFoodRecognizer returns"""
+        top = np.argsort(probabilities)[::-1][:top_k]
+        predictions = []
+        for index in top:
+            class_name = self.class_names[index] if index < len(self.class_names) else str(index)
+            predictions.append({
+                'class_name': class_name,
+                'display_name': display_name(class_name),
+                'probability': float(probabilities[index]),
+                'is_custom': True
+            })
+        return predictions
+
+    def predict_bytes(self, image_bytes, top_k=5):
+        """Decode and classify one image held in memory"""
+        return self.predict_batch(self.decode(image_bytes), top_k)[0]
@@ -0,0 +1,116 @@
+"""
+Trigram candidate index for fuzzy food-name matching
+Scoring a query against every USDA name with fuzzywuzzy doesn't scale to
+hundreds of thousands of rows. This index keeps postings of character
+trigrams, ranks rows by trigram overlap (Dice coefficient) to pick a few
+dozen candidates, and only runs the full WRatio similarity on those.
+Stored alongside the nutrition store as memory-mapped .npy files.
+"""
+
+import os
+
+import numpy as np
+
+try:
+    # python-Levenshtein>=0.20 pulls in rapidfuzz; its default processor is
+    # off, so pass fuzzywuzzy's lowercase/strip preprocessing explicitly
+    from rapidfuzz import fuzz as _fuzz, utils as _fuzz_utils
+
+    def similarity(a, b):
+        return _fuzz.WRatio(a, b, processor=_fuzz_utils.default_process)
+except ImportError:
+    from fuzzywuzzy.fuzz import WRatio as similarity
+
+
+def trigrams(normalized):
+    """Trigram keys of a normalized (ASCII a-z0-9 and space) name.
+
+    Each trigram is packed into one int, which is stable across processes
+    and cheaper than hashing strings.
+    """
+    padded = f'  {normalized} '
+    data = padded.encode('ascii', 'ignore')
+    return {(data[i] << 16) | (data[i + 1] << 8) | data[i + 2] for i in range(len(data) - 2)}
+
+
+def build_trigram_index(normalized_names, out_dir):
+    """Write trigram postings for normalized_names (one per row) to out_dir"""
+    postings = {}
+    counts = np.zeros(len(normalized_names), dtype=np.int16)
+    for row, name in enumerate(normalized_names):
+        grams = trigrams(name)
+        counts[row] = len(grams)
+        for gram in grams:
+            postings.setdefault(gram, []).append(row)
+
+    keys = np.array(sorted(postings), dtype=np.int32)
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    rows = np.empty(sum(len(p) for p in postings.values()), dtype=np.int32)
+    position = 0
+    for i, key in enumerate(keys.tolist()):
+        gram_rows = postings[key]
+        rows[position:position + len(gram_rows)] = gram_rows
+        position += len(gram_rows)
+        offsets[i + 1] = position
+
+    np.save(os.path.join(out_dir, 'trigram_keys.npy'), keys)
+    np.save(os.path.join(out_dir, 'trigram_offsets.npy'), offsets)
+    np.save(os.path.join(out_dir, 'trigram_rows.npy'), rows)
+    np.save(os.path.join(out_dir, 'trigram_counts.npy'), counts)
+
+
+class TrigramIndex:
+    """Fuzzy lookups over a memory-mapped trigram index"""
+
+    def __init__(self, path, candidates=50):
+        def load(name):
+            return np.load(os.path.join(path, name), mmap_mode='r')
+
+        self._keys = load('trigram_keys.npy')
+        self._offsets = load('trigram_offsets.npy')
+        self._rows = load('trigram_rows.npy')
+        self._counts = load('trigram_counts.npy')
+        self.candidates = candidates
+
+    @staticmethod
+    def exists(path):
+        return os.path.exists(os.path.join(path, 'trigram_keys.npy'))
+
+    def _postings(self, gram):
+        index = int(np.searchsorted(self._keys, gram))
+        if index < len(self._keys) and int(self._keys[index]) == gram:
+            return self._rows[self._offsets[index]:self._offsets[index + 1]]
+        return None
+
+    def candidate_rows(self, normalized):
+        """Rows with the highest trigram overlap with a normalized query"""
+        grams = trigrams(normalized)
+        postings = [p for p in (self._postings(g) for g in grams) if p is not None]
+        if not postings:
+            return np.empty(0, dtype=np.int32)
+
+        # Counting every posting (common trigrams included) keeps typo'd
+        # queries, whose rarest trigrams are the misspelt ones, on target;
+        # bincount over all rows is cheaper than sorting the hits
+        overlap = np.bincount(np.concatenate(postings), minlength=len(self._counts))
+        rows = np.flatnonzero(overlap)
+        overlap = overlap[rows]
+        dice = 2.0 * overlap / (len(grams) + self._counts[rows])
+        if len(rows) > self.candidates:
+            top = np.argpartition(-dice, self.candidates)[:self.candidates]
+            rows, dice = rows[top], dice[top]
+        return rows[np.argsort(-dice)]
+
+    def best_match(self, query, normalized, name_of, min_score=60):
+        """(row, score) of the best WRatio match among the candidates, or None.
+
+        name_of maps a row to its display name for scoring.
+        """
+        best = None
+        for row in self.candidate_rows(normalized).tolist():
+            score = similarity(query, name_of(row))
+            if best is None or score > best[1]:
+                best = (row, score)
+        if best is None or best[1] < min_score:
+            return None
+        return best
@@ -0,0 +1,68 @@
+"""
+Production serving config for the Food Recognition API
+
+    gunicorn -c gunicorn.conf.py flask_api:app
+
+The app (including the nutrition table) is imported once in the master and
+shared copy-on-write with the forked workers. The model itself is loaded in
+each worker after the fork, even though preload_app is set: TensorFlow's
+and the other runtimes' thread pools don't survive fork().
+
+What that costs depends on the backend:
+- tflite: the model file is memory-mapped, so workers share its pages
+  through the page cache rather than each holding a private copy.
+- recognizer (the default) and keras: every worker holds its own copy of
+  the weights and the TensorFlow runtime, so memory grows with
+  WEB_CONCURRENCY. Size the worker count for that, or switch to tflite
+  once tests/test_backend_parity.py passes for it.
+"""
+
+import gc
+import os
+import multiprocessing
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+
+# One worker per core; each worker keeps a few threads so the micro-batcher
+# has concurrent requests to batch together
+workers = int(os.getenv('WEB_CONCURRENCY', str(multiprocessing.cpu_count())))
+worker_class = 'gthread'
+threads = int(os.getenv('WORKER_THREADS', '4'))
+timeout = int(os.getenv('WORKER_TIMEOUT', '120'))
+graceful_timeout = 30
+# Recycle workers occasionally to bound slow leaks; jitter avoids all
+# workers restarting together
+max_requests = int(os.getenv('MAX_REQUESTS', '5000'))
+max_requests_jitter = int(os.getenv('MAX_REQUESTS_JITTER', '500'))
+
+preload_app = True
+
+# Split the cores between workers instead of every worker's TF/TFLite
+# runtime spawning a thread per core. Set before the master imports TF.
+_threads_per_worker = str(max(1, multiprocessing.cpu_count() // max(workers, 1)))
+os.environ.setdefault('TF_NUM_INTRAOP_THREADS', _threads_per_worker)
+os.environ.setdefault('TF_NUM_INTEROP_THREADS', '1')
+os.environ.setdefault('TFLITE_NUM_THREADS', _threads_per_worker)
+os.environ.setdefault('ONNX_NUM_THREADS', _threads_per_worker)
+
+
+def when_ready(server):
+    # Everything allocated while preloading is permanent; moving it out of
+    # the GC's reach stops collections in the workers from writing to (and
+    # so un-sharing) those pages
+    gc.freeze()
+
+    import flask_api
+    if flask_api.INFERENCE_BACKEND in ('recognizer', 'keras'):
+        server.log.warning(
+            "INFERENCE_BACKEND=%s: each of the %d workers loads a private copy of the model",
+            flask_api.INFERENCE_BACKEND, workers
+        )
+
+
+def post_fork(server, worker):
+    import flask_api
+
+    # Load and warm the model in this worker per STARTUP_MODE; its /ready
+    # turns 200 when done
+    flask_api.start_model_loading()
@@ -0,0 +1,146 @@
+"""
+Inference backends for the food model
+Each backend turns a float32 (N, H, W, C) batch into an (N, classes)
+probability array:
+- KerasBackend - the original food_model_final.keras
+- TFLiteBackend - float16 or int8-quantized TFLite conversion
+- OnnxBackend - ONNX export run with onnxruntime
+Select one with INFERENCE_BACKEND; convert_model.py builds the artifacts.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+DEFAULT_MODEL_PATHS = {
+    'keras': 'food_model_final.keras',
+    'tflite': 'food_model_final.tflite',
+    'onnx': 'food_model_final.onnx'
+}
+
+
+class KerasBackend:
+    """Full-precision Keras model behind a fixed-signature tf.function"""
+
+    name = 'keras'
+
+    def __init__(self, model_path):
+        import tensorflow as tf
+
+        self.model = tf.keras.models.load_model(model_path, compile=False)
+        _, height, width, channels = self.model.input_shape
+        self.input_shape = (int(height), int(width), int(channels or 3))
+
+        # Free batch dimension: traced once, then reused for every batch size
+        self._infer = tf.function(
+            lambda batch: self.model(batch, training=False),
+            input_signature=[tf.TensorSpec([None, *self.input_shape], tf.float32)]
+        )
+
+    def predict(self, batch):
+        return self._infer(batch).numpy()
+
+
+class TFLiteBackend:
+    """TFLite interpreter; prefers the small tflite_runtime package when installed.
+
+    Resizing an interpreter's input reallocates all of its tensors, so
+    rather than resizing per batch, batches are zero-padded up to the next
+    power of two and each of those sizes gets its own interpreter, allocated
+    once. The micro-batcher's varying batch sizes then cost at most a few
+    interpreters and up to twice the compute on a padded batch, instead of
+    a reallocation whenever the size changes.
+    """
+
+    name = 'tflite'
+
+    def __init__(self, model_path, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        num_threads = num_threads or int(os.getenv('TFLITE_NUM_THREADS', str(os.cpu_count() or 1)))
+        self._new_interpreter = lambda: Interpreter(model_path=model_path, num_threads=num_threads)
+        interpreter = self._new_interpreter()
+        interpreter.allocate_tensors()
+        self._input = interpreter.get_input_details()[0]
+        self._output = interpreter.get_output_details()[0]
+        self.input_shape = tuple(int(dim) for dim in self._input['shape'][1:])
+        # Batch size -> (interpreter, lock). An interpreter holds mutable
+        # tensor state, so each one serves one caller at a time.
+        self._interpreters = {int(self._input['shape'][0]): (interpreter, threading.Lock())}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def padded_size(count):
+        """Batch size a batch of count images is padded to"""
+        return 1 << max(count - 1, 0).bit_length()
+
+    def _interpreter(self, size):
+        with self._lock:
+            entry = self._interpreters.get(size)
+            if entry is None:
+                interpreter = self._new_interpreter()
+                interpreter.resize_tensor_input(self._input['index'], (size, *self.input_shape))
+                interpreter.allocate_tensors()
+                entry = self._interpreters[size] = (interpreter, threading.Lock())
+            return entry
+
+    def predict(self, batch):
+        count = batch.shape[0]
+        size = self.padded_size(count)
+        interpreter, lock = self._interpreter(size)
+        if size != count:
+            padded = np.zeros((size, *batch.shape[1:]), dtype=self._input['dtype'])
+            padded[:count] = batch
+        else:
+            padded = batch.astype(self._input['dtype'], copy=False)
+        with lock:
+            interpreter.set_tensor(self._input['index'], padded)
+            interpreter.invoke()
+            output = interpreter.get_tensor(self._output['index'])[:count]
+        return self._dequantize(output)
+
+    def _dequantize(self, output):
+        scale, zero_point = self._output.get('quantization', (0.0, 0))
+        if scale:
+            return (output.astype(np.float32) - zero_point) * scale
+        return output.astype(np.float32, copy=False)
+
+
+class OnnxBackend:
+    """ONNX model run with onnxruntime on CPU"""
+
+    name = 'onnx'
+
+    def __init__(self, model_path, num_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads or int(os.getenv('ONNX_NUM_THREADS', '0'))
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self._input_name = model_input.name
+        self.input_shape = tuple(int(dim) for dim in model_input.shape[1:])
+
+    def predict(self, batch):
+        return self.session.run(None, {self._input_name: batch})[0]
+
+
+BACKENDS = {
+    'keras': KerasBackend,
+    'tflite': TFLiteBackend,
+    'onnx': OnnxBackend
+}
+
+
+def create_backend(name, model_path=None):
+    """Build the named backend, using its default artifact path if none given"""
+    name = name.lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name](model_path or DEFAULT_MODEL_PATHS[name])
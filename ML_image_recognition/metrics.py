@@ -0,0 +1,200 @@
+"""
+Prometheus-style metrics for the Food Recognition API
+Labelled counters, gauges and histograms rendered in the Prometheus text
+format at /metrics, plus a per-request stage breakdown (decode, preprocess,
+inference, nutrition_lookup) observed into a histogram and sent back as a
+Server-Timing header.
+
+Metrics are kept per process; under gunicorn each scrape reaches one
+worker, so scrape workers individually or aggregate by instance.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+
+# Seconds; image requests are milliseconds to a few seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _format_value(value):
+    value = float(value)
+    if value == float('inf'):
+        return '+Inf'
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Metric:
+    """A named metric with a fixed set of label names"""
+
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def samples(self):
+        """(name, labels, value) for every sample of this metric"""
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, amount=1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            state['sum'] += value
+            state['count'] += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+
+    def snapshot(self, **labels):
+        """One series as {'buckets': {bound: cumulative count}, 'count', 'sum', 'mean'}"""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            counts = list(state['counts']) if state else [0] * len(self.buckets)
+            total, count = (state['sum'], state['count']) if state else (0.0, 0)
+        return {
+            'buckets': {_format_value(bound): n for bound, n in zip(self.buckets[:-1], counts)},
+            'count': count,
+            'sum': total,
+            'mean': total / count if count else 0.0
+        }
+
+    def samples(self):
+        with self._lock:
+            items = [(key, dict(state, counts=list(state['counts']))) for key, state in self._values.items()]
+        for key, state in items:
+            labels = dict(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, state['counts']):
+                yield f'{self.name}_bucket', {**labels, 'le': _format_value(bound)}, count
+            yield f'{self.name}_sum', labels, state['sum']
+            yield f'{self.name}_count', labels, state['count']
+
+
+class Registry:
+    """The set of metrics rendered at /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class HttpMetrics:
+    """Request, error and in-flight metrics for the HTTP layer"""
+
+    def __init__(self, registry):
+        self.requests = registry.counter('http_requests_total', 'HTTP requests by route and status', ('method', 'route', 'status'))
+        self.errors = registry.counter('http_request_errors_total', 'HTTP requests that failed with a 5xx', ('method', 'route'))
+        self.in_flight = registry.gauge('http_requests_in_flight', 'HTTP requests currently being handled')
+        self.duration = registry.histogram('http_request_duration_seconds', 'HTTP request latency', ('method', 'route'))
+
+
+class RequestStages:
+    """Stage durations for one request.
+
+    Each record() is observed into the stage histogram and summed per stage
+    for the request's Server-Timing header.
+    """
+
+    def __init__(self, histogram=None):
+        self.histogram = histogram
+        self.totals = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        if self.histogram is not None:
+            self.histogram.observe(seconds, stage=stage)
+        with self._lock:
+            self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def server_timing(self):
+        """Server-Timing header value, e.g. 'inference;dur=41.2'"""
+        with self._lock:
+            entries = []
+            for stage, seconds in self.totals.items():
+                entry = f'{stage};dur={seconds * 1000:.1f}'
+                if self.counts[stage] > 1:
+                    entry += f';desc="{self.counts[stage]} calls"'
+                entries.append(entry)
+        return ', '.join(entries)
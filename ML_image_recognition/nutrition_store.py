@@ -0,0 +1,210 @@
+"""
+Indexed, memory-mapped nutrition store
+A directory of .npy files built once from the USDA table:
+- one float64 array per nutrient column
+- food names as a UTF-8 blob plus offsets
+- exact-name index: sorted 64-bit hashes of normalized names -> rows
+- token index: sorted token hashes -> postings of rows containing them
+- trigram index for fuzzy matching (see fuzzy_index.py)
+Everything is opened with mmap_mode='r', so loading takes milliseconds,
+pages are shared between worker processes, and a lookup is a binary search
+returning a plain dict.
+
+Build from the USDA CSV with preprocess_usda.py:
+    python preprocess_usda.py usda_nutrition_database_300k.csv nutrition_index/
+"""
+
+import os
+import re
+import json
+import hashlib
+
+import numpy as np
+
+from fuzzy_index import TrigramIndex, build_trigram_index
+
+# Version 2: nutrient columns are float64 (version 1 held float32)
+STORE_VERSION = 2
+NAME_COLUMN = 'food_name'
+NUTRIENT_COLUMNS = ['energy_kcal', 'protein_g', 'fat_g', 'carbs_g', 'fiber_g']
+
+_non_alnum = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_name(name):
+    """Lowercase, strip punctuation and collapse whitespace"""
+    return _non_alnum.sub(' ', str(name).lower()).strip()
+
+
+def name_tokens(normalized):
+    """Tokens used by the token index (single characters are too common to help)"""
+    return [token for token in normalized.split() if len(token) > 1]
+
+
+def stable_hash(text):
+    """64-bit hash that is the same in every process, unlike hash()"""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def build_store(names, columns, out_dir):
+    """Write a store for names and {column: values} to out_dir.
+
+    Rows keep the order given; when two rows normalize to the same name the
+    exact index points at the first one. A store already in out_dir, of any
+    version, is replaced.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    # meta.json goes first and comes back last, so a build that fails
+    # part-way leaves a directory that doesn't open rather than a mixed store
+    for name in os.listdir(out_dir):
+        if name == 'meta.json' or (name.startswith('col_') and name.endswith('.npy')):
+            os.remove(os.path.join(out_dir, name))
+    count = len(names)
+
+    encoded = [str(name).encode('utf-8') for name in names]
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    np.save(os.path.join(out_dir, 'names.npy'), np.frombuffer(b''.join(encoded), dtype=np.uint8))
+    np.save(os.path.join(out_dir, 'name_offsets.npy'), offsets)
+
+    for column, values in columns.items():
+        np.save(os.path.join(out_dir, f'col_{column}.npy'), np.asarray(values, dtype=np.float64))
+
+    exact = {}
+    postings = {}
+    normalized_names = [normalize_name(name) for name in names]
+    for row, normalized in enumerate(normalized_names):
+        exact.setdefault(stable_hash(normalized), row)
+        for token in set(name_tokens(normalized)):
+            postings.setdefault(stable_hash(token), []).append(row)
+
+    exact_hashes = np.array(sorted(exact), dtype=np.uint64)
+    np.save(os.path.join(out_dir, 'name_hashes.npy'), exact_hashes)
+    np.save(os.path.join(out_dir, 'name_hash_rows.npy'), np.array([exact[h] for h in exact_hashes.tolist()], dtype=np.int32))
+
+    token_hashes = np.array(sorted(postings), dtype=np.uint64)
+    token_offsets = np.zeros(len(token_hashes) + 1, dtype=np.int64)
+    token_rows = []
+    for i, token_hash in enumerate(token_hashes.tolist()):
+        rows = postings[token_hash]
+        token_rows.extend(rows)
+        token_offsets[i + 1] = len(token_rows)
+    np.save(os.path.join(out_dir, 'token_hashes.npy'), token_hashes)
+    np.save(os.path.join(out_dir, 'token_offsets.npy'), token_offsets)
+    np.save(os.path.join(out_dir, 'token_rows.npy'), np.array(token_rows, dtype=np.int32))
+
+    build_trigram_index(normalized_names, out_dir)
+
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump({'version': STORE_VERSION, 'rows': count, 'columns': list(columns)}, f)
+
+
+class NutritionStore:
+    """Read-only, memory-mapped nutrition lookups"""
+
+    def __init__(self, path, fuzzy_min_score=None):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION:
+            raise ValueError(
+                f"Nutrition store at {path} is version {meta.get('version')}, expected {STORE_VERSION}; "
+                f"rebuild it with preprocess_usda.py"
+            )
+
+        def load(name):
+            return np.load(os.path.join(path, name), mmap_mode='r')
+
+        self.path = path
+        self.rows = meta['rows']
+        self.columns = {column: load(f'col_{column}.npy') for column in meta['columns']}
+        self._names = load('names.npy')
+        self._name_offsets = load('name_offsets.npy')
+        self._name_hashes = load('name_hashes.npy')
+        self._name_hash_rows = load('name_hash_rows.npy')
+        self._token_hashes = load('token_hashes.npy')
+        self._token_offsets = load('token_offsets.npy')
+        self._token_rows = load('token_rows.npy')
+        # Stores built before the trigram index still work, without fuzzy matching
+        self.fuzzy_index = TrigramIndex(path) if TrigramIndex.exists(path) else None
+        self.fuzzy_min_score = fuzzy_min_score if fuzzy_min_score is not None else int(os.getenv('FUZZY_MIN_SCORE', '80'))
+
+    def __len__(self):
+        return self.rows
+
+    def name(self, row):
+        start, end = self._name_offsets[row], self._name_offsets[row + 1]
+        return self._names[start:end].tobytes().decode('utf-8')
+
+    def record(self, row):
+        """One row as a plain dict"""
+        record = {NAME_COLUMN: self.name(row)}
+        for column, values in self.columns.items():
+            record[column] = float(values[row])
+        return record
+
+    def _search(self, hashes, value):
+        index = int(np.searchsorted(hashes, np.uint64(value)))
+        if index < len(hashes) and int(hashes[index]) == value:
+            return index
+        return None
+
+    def find_exact(self, food_name):
+        """Row whose normalized name equals food_name's, or None"""
+        normalized = normalize_name(food_name)
+        index = self._search(self._name_hashes, stable_hash(normalized))
+        if index is None:
+            return None
+        row = int(self._name_hash_rows[index])
+        # Guard against a 64-bit hash collision
+        return row if normalize_name(self.name(row)) == normalized else None
+
+    def token_postings(self, token):
+        """Rows whose name contains token (already normalized)"""
+        index = self._search(self._token_hashes, stable_hash(token))
+        if index is None:
+            return np.empty(0, dtype=np.int32)
+        return self._token_rows[self._token_offsets[index]:self._token_offsets[index + 1]]
+
+    def find_by_tokens(self, food_name):
+        """Best row sharing tokens with food_name, or None.
+
+        Intersects postings rarest token first, keeping the last non-empty
+        intersection, then picks the shortest name among the candidates,
+        which is usually the plainest entry.
+        """
+        tokens = name_tokens(normalize_name(food_name))
+        postings = [self.token_postings(token) for token in tokens]
+        postings = [p for p in postings if len(p)]
+        if not postings:
+            return None
+
+        # Intersect smallest-first to keep the work proportional to the
+        # rarest token
+        postings.sort(key=len)
+        candidates = postings[0]
+        for other in postings[1:]:
+            narrowed = np.intersect1d(candidates, other, assume_unique=True)
+            if not len(narrowed):
+                break
+            candidates = narrowed
+
+        lengths = self._name_offsets[np.asarray(candidates) + 1] - self._name_offsets[np.asarray(candidates)]
+        return int(candidates[int(np.argmin(lengths))])
+
+    def find_fuzzy(self, food_name):
+        """Best fuzzy (WRatio) match among the trigram candidates, or None"""
+        if self.fuzzy_index is None:
+            return None
+        match = self.fuzzy_index.best_match(
+            str(food_name), normalize_name(food_name), self.name, self.fuzzy_min_score
+        )
+        return match[0] if match else None
+
+    def get(self, food_name):
+        """Nutrition dict for food_name by exact, fuzzy then token match, or None"""
+        row = self.find_exact(food_name)
+        if row is None:
+            row = self.find_fuzzy(food_name)
+        if row is None:
+            row = self.find_by_tokens(food_name)
+        return self.record(row) if row is not None else None
@@ -0,0 +1,98 @@
+"""
+Preprocess the USDA nutrition CSV into a nutrition store
+Streams the source in chunks, reading only the name and nutrient columns
+with fixed dtypes, drops rows without a name, deduplicates on the
+normalized name (first occurrence wins) and writes the memory-mapped store
+from nutrition_store.py. Peak memory is bounded by the chunk size plus the
+kept output columns, not by the width of the source file.
+
+Usage:
+    python preprocess_usda.py usda_nutrition_database_300k.csv nutrition_index/
+    python preprocess_usda.py source.csv out/ --chunksize 20000 --keep-duplicates
+
+The .npy files are plain little-endian arrays with a short text header, so
+other clients (e.g. the mobile app) can read them without NumPy.
+"""
+
+import os
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from nutrition_store import NAME_COLUMN, NUTRIENT_COLUMNS, NutritionStore, build_store, normalize_name, stable_hash
+
+
+def read_usda(csv_path, chunksize=50000, keep_duplicates=False):
+    """Stream csv_path and return (names, {column: float64 array}, stats)"""
+    dtypes = {NAME_COLUMN: 'string', **{column: 'float64' for column in NUTRIENT_COLUMNS}}
+    seen = set()
+    names = []
+    parts = {column: [] for column in NUTRIENT_COLUMNS}
+    stats = {'rows_read': 0, 'missing_name': 0, 'duplicates': 0}
+
+    chunks = pd.read_csv(csv_path, usecols=list(dtypes), dtype=dtypes, chunksize=chunksize)
+    for chunk in chunks:
+        stats['rows_read'] += len(chunk)
+        display = chunk[NAME_COLUMN].str.strip()
+        keep = display.notna() & (display != '')
+        stats['missing_name'] += int((~keep).sum())
+
+        if not keep_duplicates:
+            for i, name in enumerate(display.tolist()):
+                if not keep.iat[i]:
+                    continue
+                key = stable_hash(normalize_name(name))
+                if key in seen:
+                    keep.iat[i] = False
+                    stats['duplicates'] += 1
+                else:
+                    seen.add(key)
+
+        mask = keep.to_numpy(dtype=bool)
+        names.extend(display[mask].tolist())
+        for column in NUTRIENT_COLUMNS:
+            parts[column].append(chunk[column].to_numpy(dtype=np.float64, na_value=0.0)[mask])
+
+    columns = {
+        column: np.concatenate(arrays) if arrays else np.empty(0, dtype=np.float64)
+        for column, arrays in parts.items()
+    }
+    stats['rows_kept'] = len(names)
+    return names, columns, stats
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help='USDA CSV with food_name and the nutrient columns')
+    parser.add_argument('out_dir', help='Directory to write the nutrition store to')
+    parser.add_argument('--chunksize', type=int, default=50000, help='Rows read per chunk')
+    parser.add_argument('--keep-duplicates', action='store_true',
+                        help="Keep rows whose normalized name repeats an earlier one")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    names, columns, stats = read_usda(args.source, args.chunksize, args.keep_duplicates)
+    read_seconds = time.perf_counter() - start
+    print(f"Read {stats['rows_read']} rows in {read_seconds:.1f}s: kept {stats['rows_kept']}, "
+          f"dropped {stats['missing_name']} without a name and {stats['duplicates']} duplicates")
+
+    start = time.perf_counter()
+    build_store(names, columns, args.out_dir)
+    print(f"Wrote store to {args.out_dir} in {time.perf_counter() - start:.1f}s "
+          f"({directory_size(args.out_dir) / 1e6:.1f}MB vs {os.path.getsize(args.source) / 1e6:.1f}MB CSV)")
+
+    start = time.perf_counter()
+    store = NutritionStore(args.out_dir)
+    if names:
+        store.get(names[0])
+    print(f"Store opens and serves a lookup in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -43,13 +43,18 @@ fi
 
 # Start the server
 echo
-echo "Starting Flask API server..."
 echo "Server will be available at: http://localhost:5000"
 echo
 echo "Press Ctrl+C to stop the server"
 echo
 
-python flask_api.py
+if [ "$1" == "--production" ]; then
+    echo "Starting production server (one worker per core)..."
+    gunicorn -c gunicorn.conf.py flask_api:app
+else
+    echo "Starting Flask API server..."
+    python flask_api.py
+fi
 
 echo
 echo "Server stopped."
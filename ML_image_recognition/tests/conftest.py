@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The service modules are imported as top-level modules, as flask_api.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,102 @@
+"""
+Parity of FoodClassifier with EnhancedFoodRecognizer
+INFERENCE_BACKEND stays 'recognizer' by default until this passes for the
+deployed model. It needs TensorFlow, enhanced_food_recognition and the
+model artifacts, and is skipped where they are missing.
+
+Environment:
+- PARITY_BACKEND: FoodClassifier backend to check (default: keras)
+- PARITY_IMAGES_DIR: photos to compare on; without it, a few generated
+  images are used, one of them stored sideways with an EXIF orientation
+- PARITY_TOLERANCE: allowed probability difference per class (default: 0.02)
+"""
+
+import os
+import glob
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND = os.getenv('PARITY_BACKEND', 'keras')
+TOLERANCE = float(os.getenv('PARITY_TOLERANCE', '0.02'))
+TOP_K = 5
+
+
+def generated_images():
+    """(name, JPEG bytes) for images whose content is easy to tell apart"""
+    rng = np.random.default_rng(0)
+    gradient = np.linspace(0, 255, 320, dtype=np.uint8)
+    pictures = {
+        'noise': rng.integers(0, 256, (240, 320, 3), dtype=np.uint8),
+        'gradient': np.stack([np.tile(gradient, (240, 1))] * 3, axis=-1),
+        'warm': np.full((240, 320, 3), (200, 120, 40), dtype=np.uint8),
+    }
+    images = []
+    for name, pixels in pictures.items():
+        buffer = BytesIO()
+        Image.fromarray(pixels).save(buffer, format='JPEG', quality=95)
+        images.append((name, buffer.getvalue()))
+
+    # The noise image stored rotated, with the EXIF orientation that undoes it
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buffer = BytesIO()
+    Image.fromarray(pictures['noise']).transpose(Image.Transpose.ROTATE_90).save(
+        buffer, format='JPEG', quality=95, exif=exif.tobytes()
+    )
+    images.append(('noise_exif_rotated', buffer.getvalue()))
+    return images
+
+
+def parity_images():
+    directory = os.getenv('PARITY_IMAGES_DIR')
+    if not directory:
+        return generated_images()
+    paths = sorted(glob.glob(os.path.join(directory, '*.jp*g')) + glob.glob(os.path.join(directory, '*.png')))
+    images = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            images.append((os.path.basename(path), f.read()))
+    return images
+
+
+@pytest.fixture(scope='module')
+def models():
+    pytest.importorskip('tensorflow')
+    enhanced_food_recognition = pytest.importorskip('enhanced_food_recognition')
+    from food_inference import FoodClassifier
+    from inference_backends import DEFAULT_MODEL_PATHS
+
+    if not os.path.exists(os.path.join(MODEL_DIR, DEFAULT_MODEL_PATHS[BACKEND])):
+        pytest.skip(f'{DEFAULT_MODEL_PATHS[BACKEND]} not found')
+
+    # Both load their artifacts relative to the server's directory
+    cwd = os.getcwd()
+    os.chdir(MODEL_DIR)
+    try:
+        recognizer = enhanced_food_recognition.EnhancedFoodRecognizer(model_type='efficientnet', use_custom_model=True)
+        classifier = FoodClassifier(backend=BACKEND)
+        yield recognizer, classifier
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.mark.parametrize('name, image_bytes', parity_images())
+def test_classifier_matches_recognizer(models, tmp_path, name, image_bytes):
+    recognizer, classifier = models
+    path = tmp_path / name
+    path.write_bytes(image_bytes)
+
+    expected = recognizer.predict(str(path))[:TOP_K]
+    actual = classifier.predict_bytes(image_bytes, top_k=len(classifier.class_names))
+    by_class = {prediction['class_name']: prediction for prediction in actual}
+
+    assert actual[0]['class_name'] == expected[0]['class_name']
+    for prediction in expected:
+        match = by_class[prediction['class_name']]
+        assert match['display_name'] == prediction['display_name']
+        assert match['is_custom'] == prediction.get('is_custom', False)
+        assert match['probability'] == pytest.approx(prediction['probability'], abs=TOLERANCE)
@@ -0,0 +1,40 @@
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from food_inference import FoodClassifier
+
+
+def classifier(size=(64, 48)):
+    """A FoodClassifier's decode path without loading a model"""
+    food_classifier = FoodClassifier.__new__(FoodClassifier)
+    food_classifier.input_size = size
+    food_classifier.channels = 3
+    food_classifier.input_scale = 'raw'
+    return food_classifier
+
+
+def jpeg(pixels, **save_args):
+    buffer = BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG', quality=95, **save_args)
+    return buffer.getvalue()
+
+
+def test_decode_applies_exif_orientation():
+    # Red on the left half, blue on the right
+    pixels = np.zeros((480, 640, 3), dtype=np.uint8)
+    pixels[:, :320] = (255, 0, 0)
+    pixels[:, 320:] = (0, 0, 255)
+
+    # Stored rotated, as a phone held sideways does, with orientation 6
+    # ("rotate 90 clockwise to display")
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    rotated = jpeg(np.rot90(pixels), exif=exif.tobytes())
+
+    upright = classifier().decode(jpeg(pixels))[0]
+    decoded = classifier().decode(rotated)[0]
+    assert decoded.shape == upright.shape
+    assert np.abs(decoded - upright).mean() < 8
+    assert decoded[:, :20, 0].mean() > 200 and decoded[:, -20:, 2].mean() > 200
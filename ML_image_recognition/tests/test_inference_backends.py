@@ -0,0 +1,64 @@
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from inference_backends import TFLiteBackend
+
+
+class FakeInterpreter:
+    """Stands in for the TFLite interpreter: one output per image, the sum
+    of its pixels, and a count of tensor allocations"""
+
+    instances = []
+
+    def __init__(self, model_path, num_threads=None):
+        self.shape = np.array([1, 4, 4, 3])
+        self.allocations = 0
+        FakeInterpreter.instances.append(self)
+
+    def allocate_tensors(self):
+        self.allocations += 1
+
+    def resize_tensor_input(self, index, shape):
+        self.shape = np.array(shape)
+
+    def get_input_details(self):
+        return [{'index': 0, 'shape': self.shape, 'dtype': np.float32}]
+
+    def get_output_details(self):
+        return [{'index': 1, 'quantization': (0.0, 0)}]
+
+    def set_tensor(self, index, value):
+        assert value.shape == tuple(self.shape)
+        self.input = value
+
+    def invoke(self):
+        self.output = self.input.reshape(len(self.input), -1).sum(axis=1, keepdims=True)
+
+    def get_tensor(self, index):
+        return self.output.copy()
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    module = types.ModuleType('tflite_runtime.interpreter')
+    module.Interpreter = FakeInterpreter
+    monkeypatch.setitem(sys.modules, 'tflite_runtime', types.ModuleType('tflite_runtime'))
+    monkeypatch.setitem(sys.modules, 'tflite_runtime.interpreter', module)
+    FakeInterpreter.instances = []
+    return TFLiteBackend('model.tflite', num_threads=1)
+
+
+def test_batch_sizes_reuse_padded_interpreters(backend):
+    rng = np.random.default_rng(0)
+    for count in [1, 3, 5, 3, 1, 7, 16, 4, 2, 9]:
+        batch = rng.random((count, 4, 4, 3), dtype=np.float32)
+        output = backend.predict(batch)
+        assert output.shape == (count, 1)
+        np.testing.assert_allclose(output[:, 0], batch.reshape(count, -1).sum(axis=1), rtol=1e-5)
+
+    # One interpreter per power of two, each allocated once
+    assert sorted(int(interpreter.shape[0]) for interpreter in FakeInterpreter.instances) == [1, 2, 4, 8, 16]
+    assert all(interpreter.allocations == 1 for interpreter in FakeInterpreter.instances)
@@ -0,0 +1,35 @@
+import json
+
+import numpy as np
+import pytest
+
+from nutrition_store import NutritionStore, build_store
+
+NAMES = ['Apple, raw', 'Banana, raw', 'Dal, cooked']
+COLUMNS = {
+    'energy_kcal': [52.0, 89.0, 116.0],
+    'protein_g': [0.3, 1.1, 9.02],
+    'fat_g': [0.17, 0.33, 0.38],
+}
+
+
+def test_records_keep_the_csv_values(tmp_path):
+    build_store(NAMES, COLUMNS, str(tmp_path))
+    store = NutritionStore(str(tmp_path))
+    assert store.get('apple raw') == {'food_name': 'Apple, raw', 'energy_kcal': 52.0, 'protein_g': 0.3, 'fat_g': 0.17}
+    assert store.get('Dal, cooked')['protein_g'] == 9.02
+
+
+def test_stale_stores_are_rejected_and_rebuilt(tmp_path):
+    build_store(NAMES, COLUMNS, str(tmp_path))
+    # A version 1 store, whose columns were float32
+    np.save(str(tmp_path / 'col_sugar_g.npy'), np.zeros(len(NAMES), dtype=np.float32))
+    with open(tmp_path / 'meta.json', 'w') as f:
+        json.dump({'version': 1, 'rows': len(NAMES), 'columns': list(COLUMNS) + ['sugar_g']}, f)
+    with pytest.raises(ValueError, match='rebuild'):
+        NutritionStore(str(tmp_path))
+
+    build_store(NAMES, COLUMNS, str(tmp_path))
+    store = NutritionStore(str(tmp_path))
+    assert not (tmp_path / 'col_sugar_g.npy').exists()
+    assert store.get('Banana, raw') == {'food_name': 'Banana, raw', 'energy_kcal': 89.0, 'protein_g': 1.1, 'fat_g': 0.33}
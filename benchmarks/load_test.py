@@ -0,0 +1,201 @@
+"""
+Concurrent load test for the recommendation and recognition services
+Sends seeded synthetic requests with a fixed number of concurrent clients
+and writes throughput and latency percentiles as JSON. Compare against a
+saved baseline to fail on regressions.
+
+Run the recommendation service offline with the fake LLM:
+    cd fast_api_routes && LLM_PROVIDER=fake FAKE_LLM_SEED=1 python main.py
+and the recognition service as usual (python flask_api.py), then:
+    python load_test.py --targets recommendations predict nutrition --output results.json
+    python load_test.py --baseline results.json --max-regression 0.15
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import subprocess
+from datetime import date, datetime, timezone
+
+import httpx
+
+import synthetic
+
+TARGETS = {
+    # name: (base URL option, path, body generator)
+    "recommendations": ("recommendation_url", "/recommendations/generate", synthetic.recommendation_requests),
+    "predict": ("recognition_url", "/predict", synthetic.predict_requests),
+    "nutrition": ("recognition_url", "/nutrition", synthetic.nutrition_requests),
+}
+
+
+def percentile(sorted_values, p):
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(latencies_ms, statuses, failures, elapsed):
+    ok = sorted(latencies_ms)
+    return {
+        "requests": len(statuses),
+        "errors": sum(1 for status in statuses if status is None or status >= 400),
+        # Turned away by admission control: 429 client limit, 503 load shedding
+        "rejected": sum(1 for status in statuses if status in (429, 503)),
+        # HTTP 200s whose body says success: false (recommendations report failures this way)
+        "app_failures": failures,
+        "throughput_rps": round(len(statuses) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "p50": round(percentile(ok, 50), 2) if ok else None,
+            "p95": round(percentile(ok, 95), 2) if ok else None,
+            "p99": round(percentile(ok, 99), 2) if ok else None,
+            "mean": round(sum(ok) / len(ok), 2) if ok else None,
+            "max": round(ok[-1], 2) if ok else None,
+        },
+        "status_codes": {str(status): statuses.count(status) for status in sorted(set(statuses), key=str)},
+    }
+
+
+async def run_target(client, url, bodies, concurrency, warmup):
+    """Closed-loop load: concurrency workers each send the next body as
+    soon as their previous request finishes"""
+    for body in bodies[:warmup]:
+        try:
+            await client.post(url, json=body)
+        except httpx.HTTPError:
+            pass
+
+    queue = list(reversed(bodies[warmup:]))
+    latencies, statuses = [], []
+    failures = 0
+
+    async def worker():
+        nonlocal failures
+        while queue:
+            body = queue.pop()
+            start = time.perf_counter()
+            try:
+                response = await client.post(url, json=body)
+            except httpx.HTTPError:
+                statuses.append(None)
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses.append(response.status_code)
+            if response.status_code == 200:
+                try:
+                    if response.json().get("success") is False:
+                        failures += 1
+                except ValueError:
+                    failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, statuses, failures, time.perf_counter() - start)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, max_regression):
+    """Regression messages for targets whose p99 or throughput got worse by
+    more than max_regression (a fraction) compared with baseline"""
+    problems = []
+    for target, current in results["results"].items():
+        previous = baseline.get("results", {}).get(target)
+        if not previous:
+            continue
+        old_p99, new_p99 = previous["latency_ms"]["p99"], current["latency_ms"]["p99"]
+        if old_p99 and new_p99 and new_p99 > old_p99 * (1 + max_regression):
+            problems.append(f"{target}: p99 {old_p99}ms -> {new_p99}ms")
+        old_rps, new_rps = previous["throughput_rps"], current["throughput_rps"]
+        if old_rps and new_rps and new_rps < old_rps * (1 - max_regression):
+            problems.append(f"{target}: throughput {old_rps} -> {new_rps} req/s")
+        if current["errors"] > previous["errors"]:
+            problems.append(f"{target}: errors {previous['errors']} -> {current['errors']}")
+    return problems
+
+
+async def main_async(args):
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "date": args.date.isoformat(),
+        },
+        "results": {},
+    }
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        for target in args.targets:
+            url_option, path, generator = TARGETS[target]
+            url = getattr(args, url_option).rstrip("/") + path
+            # Only the recommendation bodies carry dates
+            options = {"anchor": args.date} if target == "recommendations" else {}
+            bodies = generator(args.requests + args.warmup, seed=args.seed, **options)
+            print(f"{target}: {args.requests} requests, {args.concurrency} concurrent -> {url}", file=sys.stderr)
+            results["results"][target] = await run_target(client, url, bodies, args.concurrency, args.warmup)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument("--recommendation-url", default="http://localhost:8000")
+    parser.add_argument("--recognition-url", default="http://localhost:5000")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per target")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests sent first")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--date", type=date.fromisoformat, default=synthetic.DEFAULT_ANCHOR_DATE,
+                        help="Request date food-log histories end on, YYYY-MM-DD (default: %(default)s)")
+    parser.add_argument("--output", help="Write the JSON report here as well as to stdout")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.15,
+                        help="Allowed p99/throughput regression against --baseline, as a fraction")
+    args = parser.parse_args()
+
+    # Read first: --output may point at the baseline file
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = asyncio.run(main_async(args))
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+    if baseline is not None:
+        for key in ("seed", "date"):
+            previous = baseline.get("meta", {}).get(key, results["meta"][key])
+            if previous != results["meta"][key]:
+                print(f"WARNING baseline {key} {previous} differs from {results['meta'][key]}; "
+                      f"the runs sent different requests", file=sys.stderr)
+        problems = compare(results, baseline, args.max_regression)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Synthetic request payloads for the load tests
+Everything is generated from a seed and a fixed anchor date rather than
+today's, so two runs send identical requests whenever they happen.
+"""
+
+import io
+import base64
+import random
+from datetime import date, timedelta
+
+FOODS = [
+    ("Chicken Curry", 450), ("Egg Bhurji", 280), ("Toor Dal", 220), ("Aloo Sabzi", 250),
+    ("Veg Pizza", 700), ("Burger", 550), ("French Fries", 380), ("Green Salad", 120),
+    ("Spinach Paneer", 420), ("Banana", 105), ("Apple", 95), ("Fish Fry", 400),
+    ("Tofu Stir Fry", 320), ("Rajma Beans", 300), ("Jeera Rice", 330), ("Roti", 120),
+    ("Idli", 160), ("Masala Dosa", 380), ("Poha", 270), ("Upma", 250), ("Khichdi", 350),
+]
+MEALS = ["breakfast", "lunch", "dinner", "snack"]
+
+# Request date that log histories are generated back from
+DEFAULT_ANCHOR_DATE = date(2025, 1, 15)
+
+# Names the recognition model predicts and users type, some misspelt
+NUTRITION_QUERIES = [
+    "chicken curry", "dal", "paneer", "rice", "roti", "banana", "apple", "egg",
+    "masala dosa", "idli", "poha", "rajma", "spinach", "chiken curry", "panner",
+    "bannana", "basmati rice cooked", "whole wheat bread", "greek yogurt", "oatmeal",
+]
+
+
+def food_logs(rng, count, days=14, anchor=DEFAULT_ANCHOR_DATE):
+    """count food-log entries spread over the days days up to anchor"""
+    logs = []
+    for _ in range(count):
+        name, calories = rng.choice(FOODS)
+        logs.append({
+            "name": name,
+            "calories": calories + rng.randint(-50, 50),
+            "mealType": rng.choice(MEALS),
+            "date": (anchor - timedelta(days=rng.randrange(days))).isoformat(),
+            "quantity": rng.choice([0.5, 1.0, 1.0, 1.5, 2.0]),
+        })
+    logs.sort(key=lambda log: log["date"])
+    return logs
+
+
+def recommendation_requests(count, seed=0, logs_per_request=(10, 60), use_cache=False, mode=None,
+                            anchor=DEFAULT_ANCHOR_DATE):
+    """Bodies for POST /recommendations/generate dated anchor; the cache is
+    bypassed by default so every request exercises the LLM path"""
+    rng = random.Random(seed)
+    bodies = []
+    for _ in range(count):
+        body = {
+            "date": anchor.isoformat(),
+            "logs": food_logs(rng, rng.randint(*logs_per_request), anchor=anchor),
+            "preferences": [{"diet": rng.choice(["vegetarian", "none", "high-protein"])}],
+            "use_cache": use_cache,
+        }
+        if mode:
+            body["mode"] = mode
+        bodies.append(body)
+    return bodies
+
+
+def jpeg_image(rng, size=(640, 480), quality=85):
+    """A JPEG with a colour gradient and a few shapes, which compresses
+    like a photo rather than like noise"""
+    from PIL import Image, ImageDraw
+
+    width, height = size
+    base = Image.linear_gradient("L").resize(size)
+    image = Image.merge("RGB", (
+        base,
+        base.rotate(rng.choice([90, 180, 270])).resize(size),
+        Image.new("L", size, rng.randrange(256)),
+    ))
+    draw = ImageDraw.Draw(image)
+    for _ in range(rng.randint(3, 8)):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randint(20, width // 2), y0 + rng.randint(20, height // 2)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse([x0, y0, x1, y1], fill=color)
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=quality)
+    return out.getvalue()
+
+
+def predict_requests(count, seed=0, sizes=((640, 480), (1280, 960), (3024, 4032)), distinct=16):
+    """Bodies for POST /predict. Only distinct images are encoded and then
+    reused, since JPEG encoding would otherwise dominate the client."""
+    rng = random.Random(seed)
+    images = [
+        "data:image/jpeg;base64," + base64.b64encode(jpeg_image(rng, rng.choice(sizes))).decode("ascii")
+        for _ in range(min(distinct, count))
+    ]
+    return [{"image": images[i % len(images)]} for i in range(count)]
+
+
+def nutrition_requests(count, seed=0):
+    """Bodies for POST /nutrition"""
+    rng = random.Random(seed)
+    return [
+        {"food_name": rng.choice(NUTRITION_QUERIES), "quantity": rng.choice([50, 100, 150, 250])}
+        for _ in range(count)
+    ]
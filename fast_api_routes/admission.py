@@ -0,0 +1,275 @@
+"""
+Admission control for LLM-backed recommendation runs
+- Per-client token buckets: a client over its rate gets 429 Retry-After
+  instead of a queue slot.
+- A global token bucket paces run starts to the upstream rate limit. An
+  upstream 429 pauses it, so queued runs wait out the limit rather than
+  piling onto it.
+- A bounded priority queue for the RECOMMENDATION_CONCURRENCY run slots:
+  interactive requests go ahead of batch items. When the queue is full,
+  or a request has waited longer than the queue allows, it is shed with
+  503 Retry-After.
+- Retries of upstream 429s with exponential backoff and full jitter,
+  within the request's deadline.
+
+Limits are per worker process, like the concurrency limit they replace.
+"""
+import time
+import heapq
+import random
+import asyncio
+import itertools
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from metrics import Counter
+
+INTERACTIVE = 0
+BATCH = 1
+
+# Priority of the run the current request (or batch item) would start
+request_priority: ContextVar[int] = ContextVar("request_priority", default=INTERACTIVE)
+
+
+class AdmissionRejected(Exception):
+    """A request turned away before reaching the LLM"""
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ClientRateLimited(AdmissionRejected):
+    status_code = 429
+
+
+class Overloaded(AdmissionRejected):
+    status_code = 503
+
+
+class TokenBucket:
+    """rate tokens per second up to burst; a rate of 0 means unlimited"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def take(self) -> float:
+        """Take a token, returning 0, or the seconds until one is available"""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for seconds, and restart from empty after"""
+        now = time.monotonic()
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0.0
+        self.updated = self.paused_until
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Whether an exception is an upstream 429 (groq.RateLimitError or the fake's)"""
+    return getattr(error, "status_code", None) == 429
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """The Retry-After header of an upstream 429, if it has one"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class AdmissionController:
+    """Client and global rate limits plus a bounded priority queue in
+    front of max_concurrent run slots"""
+
+    def __init__(self, max_concurrent: int, queue_size: int = 256, max_queue_wait: float = 30.0,
+                 global_rate: float = 0.0, global_burst: float = 1.0,
+                 client_rate: float = 0.0, client_burst: float = 1.0, max_clients: int = 10000,
+                 retries: int = 3, retry_base: float = 0.5, retry_max: float = 20.0,
+                 event_counter: Optional[Counter] = None):
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.max_queue_wait = max_queue_wait
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+        self.retries = retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.event_counter = event_counter
+
+        self.active = 0
+        self.queued = 0
+        self._waiters: list = []  # (priority, seq, future); cancelled futures are skipped
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._clients: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._counts: Dict[str, int] = {}
+
+    def _count(self, event: str) -> None:
+        self._counts[event] = self._counts.get(event, 0) + 1
+        if self.event_counter is not None:
+            self.event_counter.inc(event=event)
+
+    def retry_hint(self) -> float:
+        """Seconds a shed client should wait, from the queue ahead of it"""
+        wait = max(self.queued / max(self.max_concurrent, 1), 1.0)
+        if self.global_bucket.rate:
+            wait = max(wait, self.queued / self.global_bucket.rate)
+        return min(wait, self.max_queue_wait or wait)
+
+    def check_client(self, client_id: str) -> None:
+        """Spend one of the client's tokens, or raise ClientRateLimited"""
+        if not self.client_rate:
+            return
+        bucket = self._clients.get(client_id)
+        if bucket is None:
+            bucket = self._clients[client_id] = TokenBucket(self.client_rate, self.client_burst)
+            # Idle clients' buckets are full again anyway, so forget the oldest
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        self._clients.move_to_end(client_id)
+        wait = bucket.take()
+        if wait:
+            self._count("client_limited")
+            raise ClientRateLimited("Too many recommendation requests from this client", wait)
+
+    def throttle(self, seconds: float) -> None:
+        """Stop starting runs for seconds, after the upstream said 429"""
+        self.global_bucket.pause(seconds)
+
+    def _dispatch(self) -> None:
+        """Grant free slots to the highest-priority waiters, as far as the
+        global bucket allows; re-arms a timer when it runs dry"""
+        while self._waiters and self.active < self.max_concurrent:
+            future = self._waiters[0][2]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            wait = self.global_bucket.take()
+            if wait:
+                if self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(wait, self._on_timer)
+                return
+            heapq.heappop(self._waiters)
+            self.queued -= 1
+            self.active += 1
+            future.set_result(None)
+
+    def _displace(self, priority: int) -> bool:
+        """Shed the newest waiter of the lowest priority below priority to
+        make room in a full queue, if there is one"""
+        victims = [waiter for waiter in self._waiters if waiter[0] > priority and not waiter[2].done()]
+        if not victims:
+            return False
+        victim = max(victims, key=lambda waiter: (waiter[0], waiter[1]))
+        victim[2].set_exception(Overloaded("Displaced by higher-priority requests", self.retry_hint()))
+        self.queued -= 1
+        self._count("shed_displaced")
+        return True
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    async def acquire(self, priority: int = INTERACTIVE) -> None:
+        """Wait for a run slot, or raise Overloaded"""
+        if not self._waiters and self.active < self.max_concurrent and not self.global_bucket.take():
+            self.active += 1
+            self._count("admitted")
+            return
+        if self.queued >= self.queue_size and not self._displace(priority):
+            self._count("shed_queue_full")
+            raise Overloaded("Recommendation queue is full", self.retry_hint())
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self.queued += 1
+        self._dispatch()
+        try:
+            await asyncio.wait_for(future, timeout=self.max_queue_wait or None)
+        except asyncio.TimeoutError:
+            self.queued -= 1
+            self._count("shed_timeout")
+            raise Overloaded("Timed out waiting for a recommendation slot", self.retry_hint()) from None
+        except Overloaded:
+            # Displaced by a higher-priority request; _displace did the bookkeeping
+            raise
+        except BaseException:
+            if future.done() and not future.cancelled():
+                # Granted just as the caller went away
+                self.release()
+            else:
+                future.cancel()
+                self.queued -= 1
+            raise
+        self._count("admitted")
+
+    def release(self) -> None:
+        self.active -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[int] = None):
+        await self.acquire(request_priority.get() if priority is None else priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def call_with_retry(self, call: Callable[[], Awaitable[Any]], deadline: Optional[float] = None) -> Any:
+        """Await call(), retrying upstream 429s with exponential backoff and
+        full jitter. The global bucket is paused for the wait, so other runs
+        back off too. Gives up once the next attempt would pass deadline
+        (loop time)."""
+        loop = asyncio.get_running_loop()
+        for attempt in itertools.count():
+            try:
+                return await call()
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt >= self.retries:
+                    raise
+                delay = random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+                delay = max(delay, retry_after_seconds(e) or 0.0)
+                if deadline is not None and loop.time() + delay >= deadline:
+                    raise
+                self._count("upstream_retries")
+                self.throttle(delay)
+                await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "queue_size": self.queue_size,
+            "global_rate": self.global_bucket.rate,
+            "client_rate": self.client_rate,
+            "tracked_clients": len(self._clients),
+            **self._counts,
+        }
@@ -0,0 +1,97 @@
+"""
+Micro-benchmark for nutrition gap analysis
+Compares NutritionGapAnalyzer against the original per-keyword scan on
+synthetic food-log histories and checks both produce the same result.
+
+Usage:
+    python bench_nutrition_gaps.py [--logs 1000 10000 50000] [--repeat 5]
+"""
+import time
+import random
+import argparse
+from datetime import date, timedelta
+
+from nutrition_analysis import NutritionGapAnalyzer, DEFAULT_KEYWORDS_PATH
+
+FOODS = [
+    "Chicken Curry", "Egg Bhurji", "Toor Dal", "Aloo Sabzi", "Veg Pizza", "Burger",
+    "French Fries", "Potato Chips", "Green Salad", "Spinach Paneer", "Banana",
+    "Apple", "Mixed Berry Smoothie", "Fish Fry", "Tofu Stir Fry", "Rajma Beans",
+    "Jeera Rice", "Roti", "Idli", "Masala Dosa", "Poha", "Upma", "Khichdi",
+]
+MEALS = ["breakfast", "lunch", "dinner", "snack"]
+
+
+def legacy_analyze(food_logs):
+    """The original analyze_nutrition_gaps body, kept here as the baseline"""
+    total_calories = sum(log.get('calories', 0) for log in food_logs)
+    meal_types = [log.get('mealType', '') for log in food_logs]
+    food_names = [log.get('name', '').lower() for log in food_logs]
+
+    return {
+        "total_logs": len(food_logs),
+        "total_calories": total_calories,
+        "avg_daily_calories": total_calories / max(len(set(log.get('date', '') for log in food_logs)), 1),
+        "missing_vegetables": not any('salad' in name or 'vegetable' in name or 'broccoli' in name or 'spinach' in name
+                                     for name in food_names),
+        "low_protein": not any('chicken' in name or 'fish' in name or 'egg' in name or 'bean' in name or 'tofu' in name
+                              for name in food_names),
+        "high_processed": sum(1 for name in food_names if any(proc in name for proc in ['pizza', 'burger', 'fries', 'chips'])) > len(food_names) * 0.3,
+        "missing_breakfast": 'breakfast' not in meal_types,
+        "missing_fruits": not any('apple' in name or 'banana' in name or 'berry' in name or 'fruit' in name
+                                 for name in food_names),
+        "meal_distribution": {meal: meal_types.count(meal) for meal in ['breakfast', 'lunch', 'dinner', 'snack']}
+    }
+
+
+def synthetic_logs(count, seed=42):
+    """Roughly five logs a day going back from today"""
+    rng = random.Random(seed)
+    today = date.today()
+    return [
+        {
+            "name": rng.choice(FOODS),
+            "calories": rng.randint(50, 900),
+            "mealType": rng.choice(MEALS),
+            "date": (today - timedelta(days=i // 5)).isoformat(),
+            "quantity": 1.0,
+        }
+        for i in range(count)
+    ]
+
+
+def best_of(func, logs, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(logs)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'logs':>8} {'legacy ms':>10} {'analyzer ms':>12} {'cold ms':>8} {'speedup':>8}")
+    for count in args.logs:
+        logs = synthetic_logs(count)
+        # Cold run on a fresh analyzer includes compiling and matching each name
+        start = time.perf_counter()
+        cold_analyzer = NutritionGapAnalyzer.from_file(DEFAULT_KEYWORDS_PATH)
+        cold_result = cold_analyzer.analyze(logs)
+        cold = (time.perf_counter() - start) * 1000
+
+        legacy_result = legacy_analyze(logs)
+        if cold_result != legacy_result:
+            raise SystemExit(f"Result mismatch at {count} logs:\n{cold_result}\n{legacy_result}")
+
+        legacy = best_of(legacy_analyze, logs, args.repeat)
+        fast = best_of(cold_analyzer.analyze, logs, args.repeat)
+        print(f"{count:>8} {legacy:>10.2f} {fast:>12.2f} {cold:>8.2f} {legacy / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark for incremental user profiles
+Compares the per-request server work of resending the full history
+(parse, then the fast path's prompt build: log section plus gap analysis)
+with syncing a small delta into a ProfileStore and building the same
+prompt from its window, on synthetic histories.
+
+Usage:
+    python bench_user_profile.py [--logs 1000 10000 50000] [--delta 5] [--repeat 5]
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+# The API module, named so it doesn't clash with main() below
+import main as api
+from nutrition_analysis import get_analyzer
+from user_profiles import ProfileStore
+from bench_nutrition_gaps import synthetic_logs
+
+
+def full_request(payload):
+    """What a request carrying the whole history costs the server"""
+    history = api.RequestHistory(json.loads(payload))
+    api.render_fast_prompt(history, None)
+
+
+def delta_request(store, token, payload):
+    """What a request syncing only new logs costs the server"""
+    store.sync("bench", json.loads(payload), token=token)
+    snapshot = store.snapshot("bench", api.PROMPT_RECENT_DAYS, token=token)
+    api.render_fast_prompt(snapshot, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--delta", type=int, default=5, help="New logs per request")
+    parser.add_argument("--window", type=int, default=30, help="PROFILE_WINDOW_DAYS")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'logs':>8} {'full KB':>8} {'full ms':>8} {'delta KB':>9} {'delta ms':>9} {'speedup':>8}")
+    for count in args.logs:
+        # synthetic_logs runs newest first; the oldest logs are the history
+        logs = list(reversed(synthetic_logs(count + args.delta * args.repeat)))
+        history = logs[:count]
+        full_payload = json.dumps(history)
+
+        full_best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            full_request(full_payload)
+            full_best = min(full_best, time.perf_counter() - start)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ProfileStore(os.path.join(tmp, "profiles.sqlite3"), get_analyzer(), window_days=args.window)
+            token = store.sync("bench", history)["token"]
+            delta_best = float("inf")
+            delta_payload = ""
+            for i in range(args.repeat):
+                delta_payload = json.dumps(logs[count + i * args.delta:count + (i + 1) * args.delta])
+                start = time.perf_counter()
+                delta_request(store, token, delta_payload)
+                delta_best = min(delta_best, time.perf_counter() - start)
+
+        print(f"{count:>8} {len(full_payload) / 1024:>8.1f} {full_best * 1000:>8.2f} "
+              f"{len(delta_payload) / 1024:>9.1f} {delta_best * 1000:>9.2f} {full_best / delta_best:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Offline stand-in for ChatGroq, for load tests and benchmarks
+Selected with LLM_PROVIDER=fake. It behaves like a tool-calling chat model:
+bound to tools (as in the ReAct agent) it asks for FAKE_LLM_TOOL_ROUNDS
+rounds of tool calls before answering, and unbound (the fast path and JSON
+repair) it answers straight away. Every call sleeps for a simulated
+latency and reports token usage, so the service's concurrency limits,
+timeouts, tool execution and parsing all run as they do against Groq.
+Streamed calls wait out the base latency, then send the answer a few
+characters at a time, FAKE_LLM_MS_PER_TOKEN apart.
+
+Environment:
+- FAKE_LLM_LATENCY_MS: base latency per call (default: 300)
+- FAKE_LLM_JITTER_MS: uniform extra latency, 0..jitter (default: 100)
+- FAKE_LLM_MS_PER_TOKEN: added latency per completion token (default: 0)
+- FAKE_LLM_TOOL_ROUNDS: tool-call rounds before the final answer (default: 2)
+- FAKE_LLM_FAILURE_RATE: share of calls that raise, 0-1 (default: 0)
+- FAKE_LLM_RATE_LIMIT: calls per second accepted before answering 429 like
+  Groq, with Retry-After (default: 0, no limit)
+- FAKE_LLM_SEED: seed for latency and failures (default: random)
+"""
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from admission import TokenBucket
+from prompt_builder import estimate_tokens
+
+FAKE_DISHES = [
+    ("Moong Dal Khichdi", 420, "lunch"),
+    ("Vegetable Poha", 310, "breakfast"),
+    ("Egg Bhurji with Roti", 450, "dinner"),
+    ("Palak Paneer with Rice", 520, "dinner"),
+    ("Sprouts Chaat", 220, "snack"),
+    ("Curd Rice", 350, "lunch"),
+]
+
+# Plausible arguments for the service's tools; unknown tools get none
+TOOL_ARGS = {
+    "analyze_nutrition_gaps": {},
+    "search_recipe_ideas": {"cuisine_type": "indian"},
+    "get_seasonal_ingredients": {},
+    "brainstorm_simple_meals": {"nutrition_focus": "protein"},
+}
+
+# Characters per streamed chunk, about one token each
+STREAM_CHUNK_CHARS = 4
+
+
+class FakeLLMError(RuntimeError):
+    """Simulated upstream failure"""
+
+
+class FakeRateLimitError(FakeLLMError):
+    """Simulated upstream 429, shaped like groq.RateLimitError"""
+
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__("Simulated rate limit exceeded")
+        self.response = SimpleNamespace(headers={"retry-after": f"{retry_after:.3f}"})
+
+
+class FakeChatGroq(BaseChatModel):
+    """Chat model that simulates Groq's latency and the agent's tool loop"""
+
+    latency_ms: float = 300.0
+    jitter_ms: float = 100.0
+    ms_per_token: float = 0.0
+    tool_rounds: int = 2
+    failure_rate: float = 0.0
+    rate_limit: float = 0.0
+    seed: Optional[int] = None
+    rng: Any = None
+    limiter: Any = None
+
+    @classmethod
+    def from_env(cls) -> "FakeChatGroq":
+        seed = os.getenv("FAKE_LLM_SEED")
+        return cls(
+            latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "300")),
+            jitter_ms=float(os.getenv("FAKE_LLM_JITTER_MS", "100")),
+            ms_per_token=float(os.getenv("FAKE_LLM_MS_PER_TOKEN", "0")),
+            tool_rounds=int(os.getenv("FAKE_LLM_TOOL_ROUNDS", "2")),
+            failure_rate=float(os.getenv("FAKE_LLM_FAILURE_RATE", "0")),
+            rate_limit=float(os.getenv("FAKE_LLM_RATE_LIMIT", "0")),
+            seed=int(seed) if seed else None,
+        )
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.rng = random.Random(self.seed)
+        self.limiter = TokenBucket(self.rate_limit, self.rate_limit) if self.rate_limit else None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-groq"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _reply(self, messages: List[BaseMessage], tools: Optional[List[Dict[str, Any]]]) -> AIMessage:
+        # Tool results since the user's prompt tell us which round this is
+        rounds_done = 0
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                break
+            if isinstance(message, ToolMessage):
+                rounds_done += 1
+        if tools and rounds_done < self.tool_rounds:
+            tool = tools[rounds_done % len(tools)]["function"]["name"]
+            return AIMessage(content="", tool_calls=[{
+                "name": tool,
+                "args": dict(TOOL_ARGS.get(tool, {})),
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+            }])
+        return AIMessage(content=self._final_answer())
+
+    def _final_answer(self) -> str:
+        date = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+        dishes = self.rng.sample(FAKE_DISHES, 3)
+        return json.dumps({"recommendations": [
+            {"item": name, "calories": calories, "mealType": meal, "date": date, "quantity": 1.0,
+             "reasoning": "Simple, balanced home-cooked option."}
+            for name, calories, meal in dishes
+        ]}, indent=2)
+
+    def _simulate(self, messages: List[BaseMessage], tools) -> Tuple[float, Optional[ChatResult]]:
+        """Seconds to wait and the result, or None for a simulated failure"""
+        if self.failure_rate and self.rng.random() < self.failure_rate:
+            return self.latency_ms / 1000, None
+        message = self._reply(messages, tools)
+        completion_tokens = estimate_tokens(message.content or json.dumps(message.tool_calls))
+        prompt_tokens = sum(estimate_tokens(str(m.content)) for m in messages)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        message.response_metadata = {"token_usage": usage, "model_name": self._llm_type}
+        delay = (self.latency_ms + self.rng.uniform(0, self.jitter_ms) + self.ms_per_token * completion_tokens) / 1000
+        result = ChatResult(generations=[ChatGeneration(message=message)], llm_output={"token_usage": usage})
+        return delay, result
+
+    def _check_rate_limit(self):
+        # Rejected at once, as the real API does, before any latency
+        if self.limiter is not None:
+            wait = self.limiter.take()
+            if wait:
+                raise FakeRateLimitError(wait)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._check_rate_limit()
+        delay, result = self._simulate(messages, kwargs.get("tools"))
+        time.sleep(delay)
+        if result is None:
+            raise FakeLLMError("Simulated LLM failure")
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._check_rate_limit()
+        delay, result = self._simulate(messages, kwargs.get("tools"))
+        await asyncio.sleep(delay)
+        if result is None:
+            raise FakeLLMError("Simulated LLM failure")
+        return result
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        self._check_rate_limit()
+        delay, result = self._simulate(messages, kwargs.get("tools"))
+        if result is None:
+            await asyncio.sleep(delay)
+            raise FakeLLMError("Simulated LLM failure")
+        message = result.generations[0].message
+        usage = message.response_metadata["token_usage"]
+        # The per-token share of the delay is spread over the chunks
+        token_delay = self.ms_per_token * usage["completion_tokens"] / 1000
+        await asyncio.sleep(delay - token_delay)
+        if message.tool_calls:
+            pieces = [""]
+        else:
+            pieces = [message.content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(message.content), STREAM_CHUNK_CHARS)]
+        for i, piece in enumerate(pieces):
+            last = i == len(pieces) - 1
+            chunk = AIMessageChunk(
+                content=piece,
+                tool_call_chunks=[
+                    {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+                    for index, call in enumerate(message.tool_calls)
+                ] if last else [],
+                response_metadata=message.response_metadata if last else {},
+            )
+            await asyncio.sleep(token_delay / len(pieces))
+            yield ChatGenerationChunk(message=chunk)
@@ -0,0 +1,122 @@
+"""
+JSON extraction for LLM output
+- extract_recommendations - find the recommendations in a complete reply
+- RecommendationStreamParser - pick recommendation objects out of streamed
+  text as they arrive, so each one can be sent without waiting for the rest
+"""
+import json
+from typing import Any, Dict, Iterator, List
+
+_decoder = json.JSONDecoder()
+
+
+def iter_json_values(text: str) -> Iterator[Any]:
+    """Yield every JSON object or array embedded in text, in order.
+
+    Each '{' or '[' is tried as a candidate start, so stray braces in prose
+    or markdown fences before the real payload are skipped rather than
+    failing the whole parse. Braces inside strings are handled by the
+    decoder itself.
+    """
+    index = 0
+    length = len(text)
+    while index < length:
+        starts = [pos for pos in (text.find("{", index), text.find("[", index)) if pos >= 0]
+        if not starts:
+            return
+        start = min(starts)
+        try:
+            value, end = _decoder.raw_decode(text, start)
+        except ValueError:
+            index = start + 1
+            continue
+        yield value
+        index = end
+
+
+def extract_recommendations(text: str) -> List[Dict[str, Any]]:
+    """Return the recommendation dicts from a model reply, or [] if none.
+
+    Accepts {"recommendations": [...]}, a bare list of items, or a run of
+    individual item objects, taking the first candidate that matches.
+    """
+    loose_items = []
+    for value in iter_json_values(text):
+        if isinstance(value, dict):
+            recommendations = value.get("recommendations")
+            if isinstance(recommendations, list):
+                items = [rec for rec in recommendations if isinstance(rec, dict)]
+                if items:
+                    return items
+            elif "item" in value:
+                loose_items.append(value)
+        elif isinstance(value, list):
+            items = [rec for rec in value if isinstance(rec, dict) and "item" in rec]
+            if items:
+                return items
+    return loose_items
+
+
+class RecommendationStreamParser:
+    """Emit each object of a JSON array as soon as its closing brace arrives.
+
+    Tracks string and escape state so braces inside string values don't
+    throw off the nesting depth.
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._item_start = -1
+        self._item_depth = 0
+        self._length = 0
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Consume the next chunk of text, returning newly completed items"""
+        items = []
+        for char in text:
+            self._buffer.append(char)
+            position = self._length
+            self._length += 1
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"' and self._stack:
+                self._in_string = True
+            elif char in "{[":
+                if char == "{" and self._item_start < 0 and self._stack and self._stack[-1] == "[":
+                    self._item_start = position
+                    self._item_depth = len(self._stack)
+                self._stack.append(char)
+            elif char in "}]" and self._stack:
+                self._stack.pop()
+                if char == "}" and self._item_start >= 0 and len(self._stack) == self._item_depth:
+                    item = self._decode("".join(self._buffer[self._item_start:]))
+                    self._item_start = -1
+                    if item is not None:
+                        items.append(item)
+        return items
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far"""
+        return "".join(self._buffer)
+
+    @staticmethod
+    def _decode(candidate: str):
+        try:
+            value = json.loads(candidate)
+        except ValueError:
+            return None
+        if isinstance(value, dict) and "item" in value:
+            return value
+        return None
@@ -2,39 +2,156 @@
 FastAPI Food Recommendation API using LangGraph Agent
 Endpoints:
 - POST /recommendations/generate - Generate new recommendations
+- /profiles/{user_id} - Per-user nutrition profiles, synced incrementally
 - GET /health - Health check
+- GET /metrics - Prometheus metrics
 """
+import time
+_import_started = time.perf_counter()
+
 import os
 import json
+import math
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
 from pydantic import BaseModel, Field
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-# LangGraph imports
-from langgraph.prebuilt import create_react_agent
-from langchain_core.messages import HumanMessage
-from langchain_core.tools import tool
-from langchain_groq import ChatGroq
+# langgraph, langchain and the Groq client take about a second to import,
+# so they are imported when the agent is first built (see build_agent)
+if TYPE_CHECKING:
+    from usage_tracker import UsageTracker
+
+from admission import BATCH, AdmissionController, AdmissionRejected, is_rate_limit_error, request_priority, retry_after_seconds
+from nutrition_analysis import get_analyzer
+from prompt_builder import build_log_section
+from json_extract import RecommendationStreamParser, extract_recommendations
+from metrics import HttpMetrics, MetricsMiddleware, Registry, current_stages
+from recommendation_cache import create_cache, fingerprint
+from user_profiles import ProfileAccessDenied, ProfileSnapshot, ProfileStore
 
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL = os.getenv("GROQ_MODEL", " moonshotai/kimi-k2-instruct-0905")
+# "groq" for the real API; "fake" swaps in fake_llm.FakeChatGroq, a local
+# stand-in with simulated latency and tool calls for offline load tests
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq").lower()
+
+# Max agent runs in flight per worker process; extra requests wait for a slot
+RECOMMENDATION_CONCURRENCY = int(os.getenv("RECOMMENDATION_CONCURRENCY", "32"))
+# Per-request budget (seconds) for the whole agent run
+RECOMMENDATION_TIMEOUT = float(os.getenv("RECOMMENDATION_TIMEOUT", "60"))
+# Admission control (see admission.py). Runs waiting for a slot queue by
+# priority, interactive before batch; past ADMISSION_QUEUE_SIZE waiting or
+# ADMISSION_MAX_WAIT seconds they are shed with 503 Retry-After
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "256"))
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", "30"))
+# Agent/LLM runs started per second by this worker, to stay under the
+# upstream rate limit (0 = unlimited), and the burst allowed above it
+UPSTREAM_RATE_LIMIT = float(os.getenv("UPSTREAM_RATE_LIMIT", "0"))
+UPSTREAM_RATE_BURST = float(os.getenv("UPSTREAM_RATE_BURST", str(max(UPSTREAM_RATE_LIMIT, 1))))
+# Upstream 429s are retried with exponential backoff and full jitter
+UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", "3"))
+UPSTREAM_RETRY_BASE = float(os.getenv("UPSTREAM_RETRY_BASE", "0.5"))
+# Requests per second per client (X-Client-ID, user_id or address; 0 = unlimited)
+CLIENT_RATE_LIMIT = float(os.getenv("CLIENT_RATE_LIMIT", "0"))
+CLIENT_RATE_BURST = float(os.getenv("CLIENT_RATE_BURST", "5"))
+# How often (seconds) to check whether the client has gone away
+DISCONNECT_POLL_INTERVAL = float(os.getenv("DISCONNECT_POLL_INTERVAL", "0.5"))
+# Upper bound on pooled HTTP connections to the Groq endpoint
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", str(RECOMMENDATION_CONCURRENCY)))
+# Send one tiny prompt at startup so the first user request finds a warm connection
+AGENT_WARMUP = os.getenv("AGENT_WARMUP", "false").lower() in ("1", "true", "yes")
 
-if not GROQ_API_KEY:
+# Recommendation cache: memory, sqlite or none
+RECOMMENDATION_CACHE_BACKEND = os.getenv("RECOMMENDATION_CACHE_BACKEND", "memory")
+RECOMMENDATION_CACHE_TTL = float(os.getenv("RECOMMENDATION_CACHE_TTL", "3600"))
+RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", "1024"))
+RECOMMENDATION_CACHE_PATH = os.getenv("RECOMMENDATION_CACHE_PATH", "recommendation_cache.sqlite3")
+
+# Batch endpoint: items run in parallel per batch, and max items per call
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "500"))
+# "agent" lets the ReAct agent call every tool; "fast" runs the deterministic
+# tools locally and asks the LLM once, falling back to the agent on failure
+RECOMMENDATION_MODE = os.getenv("RECOMMENDATION_MODE", "agent")
+# Ask the LLM for JSON-mode output validated against RecommendationItem; an
+# unparseable agent reply is then repaired with one JSON-mode call
+RECOMMENDATION_STRUCTURED_OUTPUT = os.getenv("RECOMMENDATION_STRUCTURED_OUTPUT", "false").lower() in ("1", "true", "yes")
+# Streaming stops generation once this many valid recommendations were sent
+STREAM_MAX_ITEMS = int(os.getenv("STREAM_MAX_ITEMS", "3"))
+# Token budget for the food-log section of the prompt; the newest
+# PROMPT_RECENT_DAYS days go in as rows, older days as one-line summaries
+PROMPT_LOG_TOKEN_BUDGET = int(os.getenv("PROMPT_LOG_TOKEN_BUDGET", "2000"))
+PROMPT_RECENT_DAYS = int(os.getenv("PROMPT_RECENT_DAYS", "3"))
+# Memoized results kept for the deterministic tools
+# Per-user profiles (see user_profiles.py): SQLite file and how many days
+# of history, counted back from the newest log, they analyze
+PROFILE_STORE_PATH = os.getenv("PROFILE_STORE_PATH", "user_profiles.sqlite3")
+PROFILE_WINDOW_DAYS = int(os.getenv("PROFILE_WINDOW_DAYS", "30"))
+# When the agent (and langgraph/langchain with it) is loaded:
+#   background - start serving at once and build it in a thread (default)
+#   warm - build before serving, for warm pools and pre-initialized snapshots
+#   lazy - build on the first request that needs it
+STARTUP_MODE = os.getenv("STARTUP_MODE", "background").lower()
+
+if LLM_PROVIDER == "groq" and not GROQ_API_KEY:
     raise RuntimeError("GROQ_API_KEY environment variable not set. Please check your .env file.")
 
+# Filled in as the process starts; reported by /health
+startup_report: Dict[str, Any] = {
+    "mode": STARTUP_MODE,
+    "import_ms": None,
+    "startup_ms": None,
+}
+
+async def prepare_agent():
+    """Build the agent off the event loop, then optionally warm the connection"""
+    await asyncio.to_thread(ensure_agent)
+    if AGENT_WARMUP:
+        await warm_up_agent()
+
+async def prepare_agent_in_background():
+    """prepare_agent() for background mode; a failed build is retried by the
+    first request that needs the agent"""
+    try:
+        await prepare_agent()
+    except Exception as e:
+        print(f"Background agent build failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the shared LLM client and agent once, per STARTUP_MODE"""
+    start = time.perf_counter()
+    background = None
+    if STARTUP_MODE == "warm":
+        await prepare_agent()
+    elif STARTUP_MODE == "background":
+        background = asyncio.create_task(prepare_agent_in_background())
+    startup_report["startup_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    print(f"Startup ({STARTUP_MODE}): module import {startup_report['import_ms']}ms, "
+          f"startup {startup_report['startup_ms']}ms")
+    yield
+    if background is not None and not background.done():
+        background.cancel()
+    await close_agent()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Food Recommendation API",
     description="AI-powered food recommendations using LangGraph agents",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -44,13 +161,68 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
+)
+
+# Prometheus-style metrics served at /metrics. Every response also carries
+# a Server-Timing header with that request's stage breakdown.
+metrics_registry = Registry()
+http_metrics = HttpMetrics(metrics_registry)
+stage_seconds = metrics_registry.histogram(
+    "recommendation_stage_seconds",
+    "Time per stage and call: profile_sync, prompt_build, queue_wait, llm, tool.<name>, parse",
+    ("stage",)
+)
+recommendation_results = metrics_registry.counter(
+    "recommendation_results_total", "Recommendation runs by mode and outcome", ("mode", "outcome")
+)
+llm_tokens = metrics_registry.counter("llm_tokens_total", "Tokens reported by the LLM", ("kind",))
+admission_events = metrics_registry.counter(
+    "admission_events_total",
+    "Admission decisions: admitted, client_limited, shed_queue_full, shed_timeout, shed_displaced, upstream_retries",
+    ("event",)
+)
+admission_active = metrics_registry.gauge("admission_active_runs", "Agent/LLM runs holding a slot")
+admission_queued = metrics_registry.gauge("admission_queue_depth", "Runs waiting for a slot")
+app.add_middleware(MetricsMiddleware, http_metrics=http_metrics, stage_histogram=stage_seconds)
+
+# Shared LLM client and compiled agent, built once in lifespan()
+agent_state: Dict[str, Any] = {
+    "llm": None,
+    "agent": None,
+    "http_client": None,
+    "import_seconds": None,
+    "build_seconds": None,
+    "built_at": None,
+    "warmup_seconds": None,
+    "reuse_count": 0,
+}
+
+recommendation_cache = create_cache(
+    RECOMMENDATION_CACHE_BACKEND,
+    max_entries=RECOMMENDATION_CACHE_SIZE,
+    ttl_seconds=RECOMMENDATION_CACHE_TTL,
+    path=RECOMMENDATION_CACHE_PATH
 )
 
-# Initialize Groq LLM
-llm = ChatGroq(
-    api_key=GROQ_API_KEY,
-    model=GROQ_MODEL,
-    temperature=0.7
+agent_build_lock = threading.Lock()
+
+# Opened on first use
+profile_state: Dict[str, Optional[ProfileStore]] = {"store": None}
+
+# Bounds concurrent agent runs so a burst can't open unlimited upstream
+# calls, and paces and prioritizes the runs that start
+admission = AdmissionController(
+    RECOMMENDATION_CONCURRENCY,
+    queue_size=ADMISSION_QUEUE_SIZE,
+    max_queue_wait=ADMISSION_MAX_WAIT,
+    global_rate=UPSTREAM_RATE_LIMIT,
+    global_burst=UPSTREAM_RATE_BURST,
+    client_rate=CLIENT_RATE_LIMIT,
+    client_burst=CLIENT_RATE_BURST,
+    retries=UPSTREAM_RETRIES,
+    retry_base=UPSTREAM_RETRY_BASE,
+    event_counter=admission_events
 )
 
 # ---------------- Pydantic Models ----------------
@@ -60,11 +232,18 @@ class FoodLog(BaseModel):
     mealType: str
     date: str
     quantity: float
+    id: Optional[str] = None  # client-side log id; makes profile syncs idempotent
 
 class RecommendationRequest(BaseModel):
     date: str
-    logs: List[FoodLog]
+    logs: List[FoodLog] = Field(default_factory=list)  # with user_id, only the logs added since the last sync
+    user_id: Optional[str] = Field(None, min_length=1, max_length=128)  # merge logs into this user's profile and use it
+    resync: bool = False  # with user_id, replace the stored profile with logs
+    profile_token: Optional[str] = Field(None, max_length=256)  # with user_id, the token the profile's first sync returned
     preferences: Optional[List[Dict[str, Any]]] = None  # user dietary preferences
+    use_cache: bool = True  # set False to force a fresh agent run
+    mode: Optional[str] = None  # "agent" or "fast"; defaults to RECOMMENDATION_MODE
+    structured: Optional[bool] = None  # JSON-mode output; defaults to RECOMMENDATION_STRUCTURED_OUTPUT
     
 class RecommendationItem(BaseModel):
     item: str
@@ -74,45 +253,60 @@ class RecommendationItem(BaseModel):
     reasoning: str
     quantity: float = 1.0
 
+class RecommendationList(BaseModel):
+    recommendations: List[RecommendationItem]
+
 class GenerateRecommendationsResponse(BaseModel):
     success: bool
     message: str
     recommendations: List[RecommendationItem]
     session_id: str
     agent_logs: Optional[List[str]] = None
+    cached: bool = False
+    mode: Optional[str] = None  # path that produced the result: agent, fast or fast+agent
+    usage: Optional[Dict[str, int]] = None  # LLM calls, tokens and prompt size for this request
+    profile: Optional[Dict[str, Any]] = None  # profile sync result when user_id was given
+
+class BatchRecommendationRequest(BaseModel):
+    requests: List[RecommendationRequest]
+    max_parallel: Optional[int] = None  # capped at BATCH_CONCURRENCY
+
+class BatchRecommendationResult(BaseModel):
+    index: int
+    success: bool
+    error: Optional[str] = None
+    result: Optional[GenerateRecommendationsResponse] = None
+
+class BatchRecommendationResponse(BaseModel):
+    success: bool
+    message: str
+    succeeded: int
+    failed: int
+    results: List[BatchRecommendationResult]
+
+class ProfileSyncRequest(BaseModel):
+    logs: List[FoodLog]
+    resync: bool = False
 
 
 # ---------------- LangGraph Tools ----------------
-@tool
-def analyze_nutrition_gaps(food_logs_json: str) -> str:
+# The gap analysis is computed once per request and kept on its history
+# (RequestHistory, ProfileSnapshot): looking a history up in a shared memo
+# means hashing all of it, which costs more than analyzing it.
+def compute_nutrition_gaps(food_logs: List[Dict[str, Any]]) -> str:
+    """Nutrition gap analysis behind the analyze_nutrition_gaps tool"""
+    return json.dumps(get_analyzer().analyze(food_logs), indent=2)
+
+# Plain functions; create_food_recommendation_agent wraps them as tools
+def analyze_nutrition_gaps(history=None) -> str:
     """Analyze nutritional gaps in recent eating patterns"""
-    try:
-        food_logs = json.loads(food_logs_json)
-    except:
-        food_logs = []
-    
-    total_calories = sum(log.get('calories', 0) for log in food_logs)
-    meal_types = [log.get('mealType', '') for log in food_logs]
-    food_names = [log.get('name', '').lower() for log in food_logs]
-    
-    gaps = {
-        "total_logs": len(food_logs),
-        "total_calories": total_calories,
-        "avg_daily_calories": total_calories / max(len(set(log.get('date', '') for log in food_logs)), 1),
-        "missing_vegetables": not any('salad' in name or 'vegetable' in name or 'broccoli' in name or 'spinach' in name
-                                     for name in food_names),
-        "low_protein": not any('chicken' in name or 'fish' in name or 'egg' in name or 'bean' in name or 'tofu' in name
-                              for name in food_names),
-        "high_processed": sum(1 for name in food_names if any(proc in name for proc in ['pizza', 'burger', 'fries', 'chips'])) > len(food_names) * 0.3,
-        "missing_breakfast": 'breakfast' not in meal_types,
-        "missing_fruits": not any('apple' in name or 'banana' in name or 'berry' in name or 'fruit' in name
-                                 for name in food_names),
-        "meal_distribution": {meal: meal_types.count(meal) for meal in ['breakfast', 'lunch', 'dinner', 'snack']}
-    }
-    
-    return json.dumps(gaps, indent=2)
+    if history is None:
+        # Outside a request there are no logs to analyze
+        return compute_nutrition_gaps([])
+    # The request's full history (or stored profile), not just what made
+    # it into the prompt's budgeted log section
+    return history.nutrition_gaps()
 
-@tool
 def search_recipe_ideas(cuisine_type: str) -> str:
     """Get guidance for recipe types, but agent should be creative within these constraints"""
     
@@ -138,10 +332,9 @@ Examples of the style I want:
 
 Be specific with actual dish names, but keep them SIMPLE and NORMAL."""
 
-@tool
-def get_seasonal_ingredients() -> str:
-    """Get seasonal ingredients for current month to suggest fresh options"""
-    month = datetime.now().month
+@lru_cache(maxsize=12)
+def seasonal_ingredients_for(month: int) -> str:
+    """Seasonal ingredient summary behind the get_seasonal_ingredients tool"""
     seasonal_map = {
         1: ["citrus fruits", "winter squash", "kale", "collard greens", "pomegranates"],
         2: ["citrus fruits", "winter squash", "kale", "collard greens", "pomegranates"],
@@ -164,7 +357,10 @@ def get_seasonal_ingredients() -> str:
         "suggestion": f"Try incorporating these fresh, seasonal ingredients: {', '.join(seasonal[:3])}"
     }, indent=2)
 
-@tool  
+def get_seasonal_ingredients() -> str:
+    """Get seasonal ingredients for current month to suggest fresh options"""
+    return seasonal_ingredients_for(datetime.now().month)
+
 def brainstorm_simple_meals(nutrition_focus: str) -> str:
     """Use your knowledge to brainstorm simple meal ideas based on nutrition focus"""
     
@@ -190,40 +386,167 @@ Now use your knowledge of Indian and international simple foods to suggest actua
 Don't just repeat examples - use your knowledge to suggest real, simple dishes that fit the nutrition focus."""
 
 # ---------------- Agent Creation ----------------
-def create_food_recommendation_agent():
+def create_llm():
+    """Create the Groq chat client with a pooled async HTTP client"""
+    if LLM_PROVIDER == "fake":
+        from fake_llm import FakeChatGroq
+        return FakeChatGroq.from_env()
+
+    from langchain_groq import ChatGroq
+
+    kwargs: Dict[str, Any] = {}
+    # Older langchain-groq releases don't expose http_async_client; they
+    # still pool through the SDK's own client, which we now share
+    if "http_async_client" in ChatGroq.model_fields:
+        import httpx
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=GROQ_MAX_CONNECTIONS
+            )
+        )
+        agent_state["http_client"] = http_client
+        kwargs["http_async_client"] = http_client
+
+    return ChatGroq(
+        api_key=GROQ_API_KEY,
+        model=GROQ_MODEL,
+        temperature=0.7,
+        # admission.call_with_retry owns retries and backoff; the SDK's own
+        # would multiply them and hide the 429s that pause the global bucket
+        max_retries=0,
+        **kwargs
+    )
+
+def create_food_recommendation_agent(llm):
     """Create the LangGraph agent with all tools"""
-    
+    from langchain_core.runnables import RunnableConfig
+    from langchain_core.tools import tool
+    from langgraph.prebuilt import create_react_agent
+
+    def analyze_user_nutrition_gaps(config: RunnableConfig) -> str:
+        """Analyze nutritional gaps in the user's eating patterns over their whole food history. Takes no arguments."""
+        return analyze_nutrition_gaps(history=config.get("configurable", {}).get("history"))
+
     tools = [
-        analyze_nutrition_gaps,
-        search_recipe_ideas,
-        get_seasonal_ingredients,
-        brainstorm_simple_meals
+        # The request's history reaches the tool through the run config
+        # (agent_config), so the model doesn't copy logs into the call
+        tool("analyze_nutrition_gaps")(analyze_user_nutrition_gaps),
+        tool(search_recipe_ideas),
+        tool(get_seasonal_ingredients),
+        tool(brainstorm_simple_meals)
     ]
     
     agent = create_react_agent(llm, tools)
     return agent
 
-# ---------------- Business Logic ----------------
-async def generate_recommendations_async(request: RecommendationRequest) -> GenerateRecommendationsResponse:
-    """Generate recommendations using the agent"""
-    
-    # Use logs sent from the request
-    food_logs = [log.dict() for log in request.logs]
+def import_agent_dependencies():
+    """Import langgraph, langchain and the LLM client, returning seconds taken"""
+    start = time.perf_counter()
+    import langgraph.prebuilt  # noqa: F401
+    import usage_tracker  # noqa: F401  (langchain_core callbacks and messages)
+    if LLM_PROVIDER == "fake":
+        import fake_llm  # noqa: F401
+    else:
+        import langchain_groq  # noqa: F401
+    return time.perf_counter() - start
 
-    if not food_logs:
-        return GenerateRecommendationsResponse(
-            success=False,
-            message="No food logs provided in request.",
-            recommendations=[],
-            session_id=""
+def build_agent():
+    """Build the shared LLM client and agent, recording how long it took"""
+    start = time.perf_counter()
+    agent_state["import_seconds"] = import_agent_dependencies()
+    llm = create_llm()
+    agent_state["agent"] = create_food_recommendation_agent(llm)
+    agent_state["llm"] = llm
+    agent_state["build_seconds"] = time.perf_counter() - start
+    agent_state["built_at"] = datetime.now().isoformat()
+    agent_state["reuse_count"] = 0
+    print(f"Recommendation agent built in {agent_state['build_seconds'] * 1000:.1f}ms "
+          f"({agent_state['import_seconds'] * 1000:.1f}ms of it importing)")
+
+def ensure_agent():
+    """Build the shared agent unless it exists; concurrent callers (the
+    background startup build and early requests) wait for one build"""
+    with agent_build_lock:
+        if agent_state["agent"] is None:
+            build_agent()
+
+def get_agent():
+    """Return the shared agent, building it if it isn't built yet"""
+    if agent_state["agent"] is None:
+        ensure_agent()
+    agent_state["reuse_count"] += 1
+    return agent_state["agent"]
+
+async def get_agent_async():
+    """get_agent() that waits for a first build in a thread, so a lazy or
+    still-running background build doesn't block the event loop"""
+    if agent_state["agent"] is None:
+        await asyncio.to_thread(ensure_agent)
+    return get_agent()
+
+async def warm_up_agent():
+    """Open the upstream connection with a minimal prompt"""
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(agent_state["llm"].ainvoke("ping"), timeout=RECOMMENDATION_TIMEOUT)
+        agent_state["warmup_seconds"] = time.perf_counter() - start
+        print(f"Recommendation agent warmed up in {agent_state['warmup_seconds'] * 1000:.1f}ms")
+    except Exception as e:
+        print(f"Agent warm-up failed: {e}")
+
+async def close_agent():
+    """Release pooled connections on shutdown"""
+    http_client = agent_state["http_client"]
+    if http_client is not None:
+        await http_client.aclose()
+    agent_state["http_client"] = None
+    agent_state["agent"] = None
+    agent_state["llm"] = None
+
+def agent_stats() -> Dict[str, Any]:
+    """Build time and reuse counters for the shared agent"""
+    return {
+        "built": agent_state["agent"] is not None,
+        "built_at": agent_state["built_at"],
+        "import_ms": round(agent_state["import_seconds"] * 1000, 2) if agent_state["import_seconds"] is not None else None,
+        "build_ms": round(agent_state["build_seconds"] * 1000, 2) if agent_state["build_seconds"] is not None else None,
+        "warmup_ms": round(agent_state["warmup_seconds"] * 1000, 2) if agent_state["warmup_seconds"] is not None else None,
+        "reuse_count": agent_state["reuse_count"],
+    }
+
+# ---------------- Business Logic ----------------
+async def run_agent(agent, payload: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Run the agent without blocking the event loop, once admitted, within
+    the per-request timeout; upstream 429s are retried inside it"""
+    queued = time.perf_counter()
+    async with admission.slot():
+        current_stages(stage_seconds).record("queue_wait", time.perf_counter() - queued)
+        deadline = asyncio.get_running_loop().time() + RECOMMENDATION_TIMEOUT
+        return await asyncio.wait_for(
+            admission.call_with_retry(lambda: agent.ainvoke(payload, config=config), deadline),
+            timeout=RECOMMENDATION_TIMEOUT
         )
-    
-    # Create agent
-    agent = create_food_recommendation_agent()
-    session_id = f"api_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    
-    # Prepare user message
-    user_message = f"""You are a practical food recommendation agent. Your goal is to analyze my recent eating patterns and provide 3 SIMPLE, everyday meal recommendations.
+
+async def cancel_on_disconnect(http_request: Request, coro):
+    """Await coro, cancelling it if the client disconnects first.
+
+    Returns None when the client went away before the result was ready.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                task.cancel()
+                return None
+    finally:
+        if not task.done():
+            task.cancel()
+
+AGENT_PROMPT_INTRO = """You are a practical food recommendation agent. Your goal is to analyze my recent eating patterns and provide 3 SIMPLE, everyday meal recommendations.
 
 IMPORTANT: Think basic home cooking.
 
@@ -232,7 +555,14 @@ Process:
 2. Look at seasonal ingredients for fresh options
 3. Use your tools for guidance, then USE YOUR OWN KNOWLEDGE to suggest actual simple dish names
 4. Provide 3 practical meal recommendations
+"""
+
+FAST_PROMPT_INTRO = """You are a practical food recommendation agent. Your goal is to use the analysis of my recent eating patterns below and provide 3 SIMPLE, everyday meal recommendations.
+
+IMPORTANT: Think basic home cooking.
+"""
 
+PROMPT_GUIDELINES = """
 Guidelines:
 - NO fancy names or creative fusion dishes
 - Focus on basic, commonly available ingredients
@@ -240,124 +570,707 @@ Guidelines:
 - DON'T just copy from tool examples - think of real dishes
 - Consider nutritional balance but keep it simple
 - Avoid foods they've eaten recently
+"""
 
-Recent food logs: {json.dumps(food_logs, indent=2)}
-User preferences: {request.preferences or []}
-
-Tools are for guidance only - use your actual knowledge of simple foods to make specific recommendations.
-
+PROMPT_OUTPUT_FORMAT = """
 Final output should be exactly 3 SIMPLE recommendations in this JSON format:
-{{
+{
   "recommendations": [
-    {{
+    {
       "item": "Simple dish name",
       "calories": estimated_calories_integer,
       "mealType": "breakfast|lunch|dinner|snack",
       "date": "YYYY-MM-DD",
       "quantity": 1.0,
       "reasoning": "Brief explanation of why this simple meal makes sense"
-    }}
+    }
   ]
-}}
+}
+"""
+
+class RequestHistory:
+    """Food history sent in full with the request. ProfileSnapshot offers
+    the same log_section/nutrition_gaps interface for stored profiles."""
+
+    def __init__(self, food_logs: List[Dict[str, Any]]):
+        self.food_logs = food_logs
+        self._gaps: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.food_logs)
+
+    def log_section(self, token_budget: int, recent_days: int) -> Tuple[str, Dict[str, int]]:
+        return build_log_section(self.food_logs, token_budget, recent_days)
+
+    def nutrition_gaps(self) -> str:
+        # Computed at most once, though the fast path, a fallback agent
+        # run and its tool may each ask
+        if self._gaps is None:
+            self._gaps = compute_nutrition_gaps(self.food_logs)
+        return self._gaps
+
+def get_profile_store() -> ProfileStore:
+    if profile_state["store"] is None:
+        profile_state["store"] = ProfileStore(PROFILE_STORE_PATH, get_analyzer(), window_days=PROFILE_WINDOW_DAYS)
+    return profile_state["store"]
 
+def sync_profile(user_id: str, food_logs: List[Dict[str, Any]], resync: bool,
+                 token: Optional[str]) -> Tuple[ProfileSnapshot, Dict[str, Any]]:
+    """Merge new logs into a profile and read it back for a recommendation;
+    raises ProfileAccessDenied without the profile's token"""
+    store = get_profile_store()
+    with current_stages(stage_seconds).time("profile_sync"):
+        sync = store.sync(user_id, food_logs, replace=resync, token=token)
+        return store.snapshot(user_id, PROMPT_RECENT_DAYS, token=sync.get("token", token)), sync
+
+async def load_history(request: RecommendationRequest):
+    """The history a request is based on and the profile sync result: its
+    own logs, or with user_id the stored profile after merging them in"""
+    food_logs = [log.model_dump() for log in request.logs]
+    if request.user_id is None:
+        return RequestHistory(food_logs), None
+    # SQLite work stays off the event loop
+    return await asyncio.to_thread(sync_profile, request.user_id, food_logs, request.resync, request.profile_token)
+
+def render_food_logs(history) -> Tuple[str, Dict[str, int]]:
+    """Food-log section of the prompt, bounded by PROMPT_LOG_TOKEN_BUDGET"""
+    return history.log_section(PROMPT_LOG_TOKEN_BUDGET, PROMPT_RECENT_DAYS)
+
+def build_agent_prompt(log_section: str, preferences: Optional[List[Dict[str, Any]]]) -> str:
+    """Prompt for the ReAct agent, which calls the tools itself"""
+    return f"""{AGENT_PROMPT_INTRO}{PROMPT_GUIDELINES}
+Recent food logs:
+{log_section}
+User preferences: {preferences or []}
+
+The nutrition gap tool already has the user's full food history, so call it without arguments.
+Tools are for guidance only - use your actual knowledge of simple foods to make specific recommendations.
+{PROMPT_OUTPUT_FORMAT}
 Please use your available tools for analysis, then use YOUR KNOWLEDGE to suggest food names."""
 
+def build_fast_prompt(history, log_section: str, preferences: Optional[List[Dict[str, Any]]]) -> str:
+    """Single-shot prompt with the deterministic tool output inlined.
+
+    The gap analysis covers the full history (for a profile, its whole
+    window) even when the log section had to be windowed.
+    """
+    stages = current_stages(stage_seconds)
+    with stages.time("tool.analyze_nutrition_gaps"):
+        nutrition_gaps = history.nutrition_gaps()
+    with stages.time("tool.get_seasonal_ingredients"):
+        seasonal = seasonal_ingredients_for(datetime.now().month)
+    return f"""{FAST_PROMPT_INTRO}{PROMPT_GUIDELINES}
+Recent food logs:
+{log_section}
+User preferences: {preferences or []}
+
+Nutrition gap analysis of these logs: {nutrition_gaps}
+Seasonal ingredients this month: {seasonal}
+
+Use this analysis for guidance, then use YOUR KNOWLEDGE to suggest specific, simple dish names.
+{PROMPT_OUTPUT_FORMAT}
+Respond with the JSON only."""
+
+def agent_config(history, tracker: "UsageTracker") -> Dict[str, Any]:
+    """Run config for the agent: usage callbacks, plus the history the
+    analyze_nutrition_gaps tool reads"""
+    return {"callbacks": [tracker], "configurable": {"history": history}}
+
+def new_usage_tracker() -> "UsageTracker":
+    """Per-request UsageTracker, timing into the current request's stages"""
+    from usage_tracker import UsageTracker
+    return UsageTracker(current_stages(stage_seconds), llm_tokens)
+
+async def run_llm(llm, prompt: str, tracker: "UsageTracker"):
+    """Single LLM call under the same admission control and timeout as the agent"""
+    from langchain_core.messages import HumanMessage
+
+    queued = time.perf_counter()
+    async with admission.slot():
+        current_stages(stage_seconds).record("queue_wait", time.perf_counter() - queued)
+        deadline = asyncio.get_running_loop().time() + RECOMMENDATION_TIMEOUT
+        return await asyncio.wait_for(
+            admission.call_with_retry(
+                lambda: llm.ainvoke([HumanMessage(content=prompt)], config={"callbacks": [tracker]}),
+                deadline
+            ),
+            timeout=RECOMMENDATION_TIMEOUT
+        )
+
+def parse_recommendations(final_message: str) -> List[RecommendationItem]:
+    """Extract the recommendations from the model's final message"""
+    response_recs = []
+    for rec in extract_recommendations(final_message):
+        item = to_recommendation_item(rec)
+        if item is not None:
+            response_recs.append(item)
+    return response_recs
+
+def to_recommendation_item(rec: Dict[str, Any]) -> Optional[RecommendationItem]:
+    """Convert one parsed recommendation dict, or None if it isn't usable"""
+    item = str(rec.get("item") or "").strip()
+    if not item:
+        return None
+
     try:
-        # Run the agent
-        response = agent.invoke({"messages": [HumanMessage(content=user_message)]})
-        final_message = response["messages"][-1].content
-        
-        # Extract JSON recommendations
-        recommendations = []
-        if "{" in final_message:
-            try:
-                json_start = final_message.find("{")
-                json_part = final_message[json_start:]
-                
-                brace_count = 0
-                json_end = 0
-                for idx, char in enumerate(json_part):
-                    if char == "{":
-                        brace_count += 1
-                    elif char == "}":
-                        brace_count -= 1
-                        if brace_count == 0:
-                            json_end = idx + 1
-                            break
-                
-                if json_end > 0:
-                    json_str = json_part[:json_end]
-                    parsed = json.loads(json_str)
-                    recommendations = parsed.get("recommendations", [])
-                    
-            except Exception as e:
-                return GenerateRecommendationsResponse(
-                    success=False,
-                    message=f"Error parsing agent response: {str(e)}",
-                    recommendations=[],
-                    session_id=session_id
-                )
-        
-        if not recommendations:
-            return GenerateRecommendationsResponse(
-                success=False,
-                message="Agent did not return valid recommendations",
-                recommendations=[],
-                session_id=session_id
-            )
-        
-        # Convert to response format
-        response_recs = []
-        for rec in recommendations:
-            item = rec.get("item", "").strip()
-            if not item:
-                continue
-                
-            response_recs.append(RecommendationItem(
-                item=item,
-                calories=int(rec.get("calories", 0)),
-                mealType=rec.get("mealType", "snack"),
-                date=rec.get("date", (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")),
-                reasoning=rec.get("reasoning", ""),
-                quantity=float(rec.get("quantity", 1.0))
-            ))
-        
+        return RecommendationItem(
+            item=item,
+            calories=int(float(rec.get("calories") or 0)),
+            mealType=rec.get("mealType") or "snack",
+            date=rec.get("date") or (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d"),
+            reasoning=rec.get("reasoning") or "",
+            quantity=float(rec.get("quantity") or 1.0)
+        )
+    except (TypeError, ValueError):
+        return None
+
+def json_mode_llm():
+    """The shared LLM constrained to reply with a single JSON object"""
+    return agent_state["llm"].bind(response_format={"type": "json_object"})
+
+def parse_structured(content: str) -> List[RecommendationItem]:
+    """Validate a JSON-mode reply against the response schema, falling
+    back to the lenient parser for partially valid replies"""
+    try:
+        return RecommendationList.model_validate_json(content).recommendations
+    except ValueError:
+        return parse_recommendations(content)
+
+async def repair_recommendations(final_message: str, tracker: "UsageTracker") -> List[RecommendationItem]:
+    """Reformat an unparseable agent reply with one JSON-mode call instead
+    of throwing the whole agent run away"""
+    prompt = f"""Convert the meal recommendations in the text below into JSON.
+{PROMPT_OUTPUT_FORMAT}
+Text:
+{final_message}"""
+    message = await run_llm(json_mode_llm(), prompt, tracker)
+    with tracker.stages.time("parse"):
+        return parse_structured(message.content)
+
+def render_fast_prompt(history, preferences: Optional[List[Dict[str, Any]]]) -> Tuple[str, Dict[str, int]]:
+    """The fast path's prompt and log-section stats"""
+    log_section, log_stats = render_food_logs(history)
+    return build_fast_prompt(history, log_section, preferences), log_stats
+
+async def generate_fast_path(history, preferences, tracker: "UsageTracker", structured: bool = False) -> List[RecommendationItem]:
+    """Run the deterministic tools locally and ask the LLM once"""
+    await get_agent_async()  # make sure the shared client exists
+    # Includes the locally computed tools, which are also timed on their own.
+    # The analysis grows with the history, so it stays off the event loop.
+    with tracker.stages.time("prompt_build"):
+        prompt, log_stats = await asyncio.to_thread(render_fast_prompt, history, preferences)
+    tracker.record_prompt(prompt, log_stats)
+    llm = json_mode_llm() if structured else agent_state["llm"]
+    message = await run_llm(llm, prompt, tracker)
+    with tracker.stages.time("parse"):
+        return parse_structured(message.content) if structured else parse_recommendations(message.content)
+
+async def generate_agent_path(history, preferences, tracker: "UsageTracker", structured: bool = False) -> List[RecommendationItem]:
+    """Let the ReAct agent call the tools itself"""
+    from langchain_core.messages import HumanMessage
+
+    agent = await get_agent_async()
+    with tracker.stages.time("prompt_build"):
+        log_section, log_stats = render_food_logs(history)
+        prompt = build_agent_prompt(log_section, preferences)
+    tracker.record_prompt(prompt, log_stats)
+    response = await run_agent(agent, {"messages": [HumanMessage(content=prompt)]}, config=agent_config(history, tracker))
+    final_message = response["messages"][-1].content
+    with tracker.stages.time("parse"):
+        recommendations = parse_recommendations(final_message)
+    if not recommendations and structured and final_message.strip():
+        recommendations = await repair_recommendations(final_message, tracker)
+    return recommendations
+
+def no_logs_message(request: RecommendationRequest) -> str:
+    if request.user_id is not None:
+        return "No food logs stored for this user."
+    return "No food logs provided in request."
+
+async def generate_recommendations_async(request: RecommendationRequest, history) -> GenerateRecommendationsResponse:
+    """Generate recommendations from history using the fast path or the agent"""
+    if not len(history):
         return GenerateRecommendationsResponse(
-            success=True,
-            message=f"Successfully generated {len(response_recs)} recommendations",
-            recommendations=response_recs,
-            session_id=session_id
+            success=False,
+            message=no_logs_message(request),
+            recommendations=[],
+            session_id=""
         )
-        
-    except Exception as e:
+    
+    session_id = f"api_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    mode = (request.mode or RECOMMENDATION_MODE).lower()
+    structured = RECOMMENDATION_STRUCTURED_OUTPUT if request.structured is None else request.structured
+    tracker = new_usage_tracker()
+
+    def failure(message: str, outcome: str) -> GenerateRecommendationsResponse:
+        recommendation_results.inc(mode=mode, outcome=outcome)
         return GenerateRecommendationsResponse(
             success=False,
-            message=f"Error generating recommendations: {str(e)}",
+            message=message,
             recommendations=[],
-            session_id=session_id
+            session_id=session_id,
+            mode=mode,
+            usage=tracker.summary()
         )
 
+    response_recs: List[RecommendationItem] = []
+    if mode == "fast":
+        try:
+            response_recs = await generate_fast_path(history, request.preferences, tracker, structured)
+        except asyncio.TimeoutError:
+            return failure(f"Recommendation generation timed out after {RECOMMENDATION_TIMEOUT:g}s", "timeout")
+        except AdmissionRejected:
+            recommendation_results.inc(mode=mode, outcome="rejected")
+            raise
+        except Exception as e:
+            # Anything short of a clean answer falls back to the full agent
+            print(f"Fast path failed, falling back to agent: {e}")
+        if not response_recs:
+            recommendation_results.inc(mode=mode, outcome="fallback")
+            mode = "fast+agent"
+
+    if not response_recs:
+        try:
+            response_recs = await generate_agent_path(history, request.preferences, tracker, structured)
+        except asyncio.TimeoutError:
+            return failure(f"Recommendation generation timed out after {RECOMMENDATION_TIMEOUT:g}s", "timeout")
+        except AdmissionRejected:
+            # Surfaced as 503/429 with Retry-After by admission_rejected()
+            recommendation_results.inc(mode=mode, outcome="rejected")
+            raise
+        except Exception as e:
+            return failure(f"Error generating recommendations: {str(e)}", "error")
+
+    if not response_recs:
+        return failure("Agent did not return valid recommendations", "empty")
+
+    recommendation_results.inc(mode=mode, outcome="success")
+    return GenerateRecommendationsResponse(
+        success=True,
+        message=f"Successfully generated {len(response_recs)} recommendations",
+        recommendations=response_recs,
+        session_id=session_id,
+        mode=mode,
+        usage=tracker.summary()
+    )
+
+def request_fingerprint(request: RecommendationRequest) -> str:
+    """Key for a request as sent; the model name is mixed in so switching
+    GROQ_MODEL doesn't serve another model's answers"""
+    salt = GROQ_MODEL if request.user_id is None else f"{GROQ_MODEL}:{request.user_id}:{request.resync}"
+    return fingerprint(
+        request.date,
+        [log.model_dump() for log in request.logs],
+        request.preferences,
+        salt=salt
+    )
+
+def cache_key(request: RecommendationRequest, history) -> str:
+    """Cache key for a request's result. A profile request's logs are only
+    a delta, so its key uses the profile revision they produced instead."""
+    if request.user_id is None:
+        return request_fingerprint(request)
+    return fingerprint(request.date, [], request.preferences, salt=f"{GROQ_MODEL}:profile:{request.user_id}:{history.revision}")
+
+async def get_recommendations(request: RecommendationRequest) -> GenerateRecommendationsResponse:
+    """Serve from the recommendation cache when possible, else run the agent"""
+    history, sync = await load_history(request)
+    if recommendation_cache is None or not request.use_cache:
+        response = await generate_recommendations_async(request, history)
+        response.profile = sync
+        return response
+
+    key = cache_key(request, history)
+    cached = await recommendation_cache.aget(key)
+    if cached is not None:
+        response = GenerateRecommendationsResponse(**cached)
+        response.cached = True
+        response.profile = sync
+        recommendation_results.inc(mode=response.mode or "", outcome="cached")
+        return response
+
+    response = await generate_recommendations_async(request, history)
+    # Only cache successful runs so failures are retried
+    if response.success:
+        await recommendation_cache.aset(key, response.model_dump())
+    response.profile = sync
+    return response
+
+async def generate_batch_async(batch: BatchRecommendationRequest) -> BatchRecommendationResponse:
+    """Run a batch of recommendation requests with bounded parallelism.
+
+    Identical requests inside a batch share one agent run, and the
+    deterministic tools are memoized, so shared work is done once.
+    Results come back in request order with one entry per item.
+    """
+    parallel = min(batch.max_parallel or BATCH_CONCURRENCY, BATCH_CONCURRENCY)
+    # Batch items queue behind interactive requests; the tasks below copy this context
+    request_priority.set(BATCH)
+    semaphore = asyncio.Semaphore(max(parallel, 1))
+    shared_runs: Dict[str, asyncio.Task] = {}
+
+    async def run_one(request: RecommendationRequest) -> GenerateRecommendationsResponse:
+        async with semaphore:
+            return await get_recommendations(request)
+
+    tasks = []
+    for request in batch.requests:
+        # The token is part of the key, so an item with a wrong token can't
+        # share the run of one with the right token
+        key = f"{request.use_cache}:{request.profile_token}:{request_fingerprint(request)}"
+        if key not in shared_runs:
+            shared_runs[key] = asyncio.ensure_future(run_one(request))
+        tasks.append(shared_runs[key])
+
+    try:
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        for task in shared_runs.values():
+            task.cancel()
+
+    results = []
+    for index, outcome in enumerate(outcomes):
+        if isinstance(outcome, BaseException):
+            results.append(BatchRecommendationResult(index=index, success=False, error=str(outcome) or type(outcome).__name__))
+        else:
+            results.append(BatchRecommendationResult(
+                index=index,
+                success=outcome.success,
+                error=None if outcome.success else outcome.message,
+                result=outcome
+            ))
+
+    succeeded = sum(1 for r in results if r.success)
+    return BatchRecommendationResponse(
+        success=succeeded == len(results),
+        message=f"Generated recommendations for {succeeded}/{len(results)} requests",
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results
+    )
+
+# ---------------- Streaming ----------------
+def stream_event(event: str, stream_format: str, **data) -> str:
+    """Encode one event as an SSE frame or an NDJSON line"""
+    payload = json.dumps({"event": event, **data})
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+def tool_call_names(message) -> List[str]:
+    """Names of the tools an AI message asks for, across langchain versions"""
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        return [call.get("name", "") for call in tool_calls]
+    raw_calls = (getattr(message, "additional_kwargs", None) or {}).get("tool_calls") or []
+    return [call.get("function", {}).get("name", "") for call in raw_calls]
+
+async def iterate_until(source, deadline: float):
+    """Yield from an async iterator, raising TimeoutError past the deadline"""
+    loop = asyncio.get_running_loop()
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise asyncio.TimeoutError()
+        try:
+            yield await asyncio.wait_for(source.__anext__(), timeout=remaining)
+        except StopAsyncIteration:
+            return
+
+async def stream_fast_path(history, preferences, tracker: "UsageTracker"):
+    """Token stream of the single-shot prompt, as (kind, value) pairs"""
+    from langchain_core.messages import HumanMessage
+
+    await get_agent_async()
+    with tracker.stages.time("prompt_build"):
+        prompt, log_stats = await asyncio.to_thread(render_fast_prompt, history, preferences)
+    tracker.record_prompt(prompt, log_stats)
+    yield "progress", {"step": "analysis", "detail": "Nutrition gaps and seasonal ingredients computed locally"}
+    async for chunk in agent_state["llm"].astream([HumanMessage(content=prompt)], config={"callbacks": [tracker]}):
+        if chunk.content:
+            yield "text", chunk.content
+
+async def stream_agent_path(history, preferences, tracker: "UsageTracker"):
+    """Agent step updates and the answer's tokens, as (kind, value) pairs"""
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    agent = await get_agent_async()
+    with tracker.stages.time("prompt_build"):
+        log_section, log_stats = render_food_logs(history)
+        prompt = build_agent_prompt(log_section, preferences)
+    tracker.record_prompt(prompt, log_stats)
+    # "messages" streams the model's tokens as they are generated, so items
+    # go out as they parse and closing the stream stops generation;
+    # "updates" reports the tool steps in between
+    events = agent.astream(
+        {"messages": [HumanMessage(content=prompt)]},
+        config=agent_config(history, tracker),
+        stream_mode=["updates", "messages"]
+    )
+    async for stream_mode, payload in events:
+        if stream_mode == "messages":
+            message, metadata = payload
+            if metadata.get("langgraph_node") == "agent" and isinstance(message, AIMessage) and message.content:
+                yield "text", message.content
+            continue
+        for node, output in payload.items():
+            for message in (output or {}).get("messages", []):
+                if node == "tools":
+                    yield "progress", {"step": "tool_result", "tool": getattr(message, "name", None)}
+                    continue
+                names = tool_call_names(message)
+                if names:
+                    yield "progress", {"step": "tool_call", "tools": names}
+
+async def stream_recommendations(request: RecommendationRequest, history, sync: Optional[Dict[str, Any]], stream_format: str):
+    """Stream progress events and each recommendation as soon as it parses.
+
+    Generation stops early once STREAM_MAX_ITEMS valid items have been sent.
+    """
+    if not len(history):
+        yield stream_event("error", stream_format, message=no_logs_message(request), profile=sync)
+        return
+
+    use_cache = recommendation_cache is not None and request.use_cache
+    key = cache_key(request, history) if use_cache else None
+    if use_cache:
+        cached = await recommendation_cache.aget(key)
+        if cached is not None:
+            response = GenerateRecommendationsResponse(**cached)
+            recommendation_results.inc(mode=response.mode or "", outcome="cached")
+            for item in response.recommendations:
+                yield stream_event("recommendation", stream_format, data=item.model_dump())
+            yield stream_event(
+                "done", stream_format,
+                success=True,
+                count=len(response.recommendations),
+                session_id=response.session_id,
+                mode=response.mode,
+                usage=response.usage,
+                cached=True,
+                profile=sync
+            )
+            return
+
+    session_id = f"api_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    mode = (request.mode or RECOMMENDATION_MODE).lower()
+    tracker = new_usage_tracker()
+    items: List[RecommendationItem] = []
+    yield stream_event("start", stream_format, session_id=session_id, mode=mode)
+
+    paths = [stream_fast_path, stream_agent_path] if mode == "fast" else [stream_agent_path]
+    outcome = "empty"
+    try:
+        queued = time.perf_counter()
+        async with admission.slot():
+            tracker.stages.record("queue_wait", time.perf_counter() - queued)
+            deadline = asyncio.get_running_loop().time() + RECOMMENDATION_TIMEOUT
+            for path in paths:
+                if path is stream_agent_path and mode == "fast":
+                    mode = "fast+agent"
+                    yield stream_event("progress", stream_format, step="fallback", detail="Fast path gave no recommendations, running agent")
+                parser = RecommendationStreamParser()
+                source = path(history, request.preferences, tracker)
+                try:
+                    async for kind, value in iterate_until(source, deadline):
+                        if kind == "progress":
+                            yield stream_event("progress", stream_format, **value)
+                            continue
+                        for rec in parser.feed(value):
+                            item = to_recommendation_item(rec)
+                            if item is None:
+                                continue
+                            items.append(item)
+                            yield stream_event("recommendation", stream_format, data=item.model_dump())
+                            if len(items) >= STREAM_MAX_ITEMS:
+                                break
+                        if len(items) >= STREAM_MAX_ITEMS:
+                            break
+                finally:
+                    await source.aclose()
+                if not items:
+                    # The reply didn't stream as an array of objects; try
+                    # every candidate in the full text before giving up
+                    for item in parse_recommendations(parser.text)[:STREAM_MAX_ITEMS]:
+                        items.append(item)
+                        yield stream_event("recommendation", stream_format, data=item.model_dump())
+                if items:
+                    break
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        yield stream_event("error", stream_format, message=f"Recommendation generation timed out after {RECOMMENDATION_TIMEOUT:g}s")
+    except AdmissionRejected as e:
+        # The response has started, so the status and Retry-After go in the event
+        outcome = "rejected"
+        yield stream_event("error", stream_format, message=str(e), status=e.status_code, retry_after=math.ceil(e.retry_after))
+    except Exception as e:
+        outcome = "error"
+        if is_rate_limit_error(e):
+            # Tokens may already have been sent, so a stream isn't retried;
+            # pausing new runs still spares the others
+            admission.throttle(retry_after_seconds(e) or UPSTREAM_RETRY_BASE)
+        yield stream_event("error", stream_format, message=f"Error generating recommendations: {str(e)}")
+    recommendation_results.inc(mode=mode, outcome="success" if items else outcome)
+
+    response = GenerateRecommendationsResponse(
+        success=bool(items),
+        message=f"Successfully generated {len(items)} recommendations" if items else "Agent did not return valid recommendations",
+        recommendations=items,
+        session_id=session_id,
+        mode=mode,
+        usage=tracker.summary()
+    )
+    if use_cache and response.success:
+        await recommendation_cache.aset(key, response.model_dump())
+    yield stream_event(
+        "done", stream_format,
+        success=response.success,
+        count=len(items),
+        session_id=session_id,
+        mode=mode,
+        usage=response.usage,
+        cached=False,
+        profile=sync
+    )
+
 # ---------------- API Endpoints ----------------
 
+def client_id(http_request: Request, user_id: Optional[str] = None) -> str:
+    """Who a request counts against for CLIENT_RATE_LIMIT"""
+    header = http_request.headers.get("x-client-id")
+    if header:
+        return f"client:{header}"
+    if user_id:
+        return f"user:{user_id}"
+    return f"addr:{http_request.client.host if http_request.client else 'unknown'}"
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(http_request: Request, exc: AdmissionRejected):
+    """429 for a client over its rate limit, 503 for shed load; both say when to retry"""
+    retry_after = max(math.ceil(exc.retry_after), 1)
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"success": False, "message": str(exc), "retry_after": retry_after},
+        headers={"Retry-After": str(retry_after)}
+    )
+
+@app.exception_handler(ProfileAccessDenied)
+async def profile_access_denied(http_request: Request, exc: ProfileAccessDenied):
+    """401 without a profile token, 403 with the wrong one"""
+    return JSONResponse(status_code=exc.status_code, content={"success": False, "message": str(exc)})
+
 @app.post("/recommendations/generate", response_model=GenerateRecommendationsResponse)
-async def generate_recommendations(request: RecommendationRequest):
+async def generate_recommendations(request: RecommendationRequest, http_request: Request):
     """Generate food recommendations based on provided food logs"""
-    recommendations = await generate_recommendations_async(request)
+    admission.check_client(client_id(http_request, request.user_id))
+    recommendations = await cancel_on_disconnect(http_request, get_recommendations(request))
+    if recommendations is None:
+        return GenerateRecommendationsResponse(
+            success=False,
+            message="Client disconnected before recommendations were ready",
+            recommendations=[],
+            session_id=""
+        )
     return recommendations
 
+@app.post("/recommendations/generate_batch", response_model=BatchRecommendationResponse)
+async def generate_recommendations_batch(batch: BatchRecommendationRequest, http_request: Request):
+    """Generate recommendations for many users in one call"""
+    if len(batch.requests) > BATCH_MAX_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large: max {BATCH_MAX_SIZE} requests")
+    admission.check_client(client_id(http_request))
+    response = await cancel_on_disconnect(http_request, generate_batch_async(batch))
+    if response is None:
+        raise HTTPException(status_code=499, detail="Client disconnected before batch finished")
+    return response
+
+@app.post("/recommendations/generate_stream")
+async def generate_recommendations_stream(
+    request: RecommendationRequest,
+    http_request: Request,
+    stream_format: Optional[str] = Query(None, alias="format")
+):
+    """Stream recommendations as NDJSON (default) or server-sent events"""
+    if stream_format is None:
+        stream_format = "sse" if "text/event-stream" in http_request.headers.get("accept", "") else "ndjson"
+    if stream_format not in ("sse", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'sse' or 'ndjson'")
+    admission.check_client(client_id(http_request, request.user_id))
+    # Synced before the response starts, so a bad profile token is a plain 401/403
+    history, sync = await load_history(request)
+
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_recommendations(request, history, sync, stream_format),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/recommendations/cache")
+async def cache_stats():
+    """Recommendation cache hit/miss counters"""
+    if recommendation_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **recommendation_cache.stats()}
+
+@app.delete("/recommendations/cache")
+async def clear_cache():
+    """Drop all cached recommendations"""
+    if recommendation_cache is not None:
+        recommendation_cache.clear()
+    return {"success": True}
+
+# Profile routes take the token from the profile's first sync in X-Profile-Token
+@app.post("/profiles/{user_id}/logs")
+async def sync_profile_logs(user_id: str, body: ProfileSyncRequest,
+                            x_profile_token: Optional[str] = Header(None)):
+    """Merge new logs into a user's profile without generating recommendations"""
+    store = get_profile_store()
+    food_logs = [log.model_dump() for log in body.logs]
+    sync = await asyncio.to_thread(store.sync, user_id, food_logs, body.resync, x_profile_token)
+    return {"success": True, **sync}
+
+@app.get("/profiles/{user_id}")
+async def get_profile(user_id: str, x_profile_token: Optional[str] = Header(None)):
+    """A user's rolling window: daily calories and nutrition gap analysis"""
+    snapshot = await asyncio.to_thread(get_profile_store().snapshot, user_id, 0, x_profile_token)
+    if snapshot.revision is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return snapshot.stats()
+
+@app.delete("/profiles/{user_id}")
+async def delete_profile(user_id: str, x_profile_token: Optional[str] = Header(None)):
+    """Forget a user's stored logs and aggregates"""
+    deleted = await asyncio.to_thread(get_profile_store().delete, user_id, x_profile_token)
+    return {"success": deleted}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    admission_active.set(admission.active)
+    admission_queued.set(admission.queued)
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "message": "Food Recommendation API is running"
+        "message": "Food Recommendation API is running",
+        "agent": agent_stats(),
+        "admission": admission.stats(),
+        "startup": startup_report
     }
 
+startup_report["import_ms"] = round((time.perf_counter() - _import_started) * 1000, 2)
+
 # ---------------- Development Server ----------------
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(
-        app, 
+        "main:app",
         host="0.0.0.0",
         port=8000,
         reload=True,
@@ -0,0 +1,264 @@
+"""
+Prometheus-style metrics for the recommendation API
+Labelled counters, gauges and histograms rendered in the Prometheus text
+format at /metrics, plus a per-request stage breakdown (prompt build,
+queue wait, each LLM and tool call, parse) that is observed into a
+histogram and returned to the client as a Server-Timing header.
+
+Metrics live in the worker process; with several uvicorn workers each
+scrape sees one worker, so scrape them per process or run one worker.
+"""
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Tuple
+
+# Seconds; LLM calls and agent runs reach tens of seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Metric:
+    """A named metric with a fixed set of label names"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self):
+        """(name, labels, value) for every sample of this metric"""
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, self._labels(key), value
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            state["sum"] += value
+            state["count"] += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(key, dict(state, counts=list(state["counts"]))) for key, state in self._values.items()]
+        for key, state in items:
+            labels = self._labels(key)
+            for bound, count in zip(self.buckets, state["counts"]):
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, count
+            yield f"{self.name}_sum", labels, state["sum"]
+            yield f"{self.name}_count", labels, state["count"]
+
+
+class Registry:
+    """The set of metrics rendered at /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class RequestStages:
+    """Stage durations for one request.
+
+    Each record() is observed into the stage histogram (so every LLM or
+    tool call is its own sample) and summed per stage for the request.
+    """
+
+    def __init__(self, histogram: Optional[Histogram] = None):
+        self.histogram = histogram
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        if self.histogram is not None:
+            self.histogram.observe(seconds, stage=stage)
+        with self._lock:
+            self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                stage: {"ms": round(seconds * 1000, 2), "count": self.counts[stage]}
+                for stage, seconds in self.totals.items()
+            }
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, e.g. 'llm;dur=812.4;desc="2 calls"'"""
+        with self._lock:
+            entries = []
+            for stage, seconds in self.totals.items():
+                entry = f"{stage};dur={seconds * 1000:.1f}"
+                if self.counts[stage] > 1:
+                    entry += f';desc="{self.counts[stage]} calls"'
+                entries.append(entry)
+        return ", ".join(entries)
+
+
+_current_stages: contextvars.ContextVar[Optional[RequestStages]] = contextvars.ContextVar("request_stages", default=None)
+
+
+def current_stages(histogram: Optional[Histogram] = None) -> RequestStages:
+    """The stages of the request being handled, or a detached recorder
+    (still feeding histogram) outside of one"""
+    stages = _current_stages.get()
+    return stages if stages is not None else RequestStages(histogram)
+
+
+class HttpMetrics:
+    """Request, error and in-flight metrics for the HTTP layer"""
+
+    def __init__(self, registry: Registry):
+        self.requests = registry.counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+        self.errors = registry.counter("http_request_errors_total", "HTTP requests that failed with a 5xx or an exception", ("method", "route"))
+        self.in_flight = registry.gauge("http_requests_in_flight", "HTTP requests currently being handled")
+        self.duration = registry.histogram("http_request_duration_seconds", "HTTP request latency including streamed bodies", ("method", "route"))
+
+
+class MetricsMiddleware:
+    """ASGI middleware that feeds HttpMetrics, timing streamed bodies too.
+
+    Each request gets a RequestStages in a context variable; its totals so
+    far are sent back in the Server-Timing header.
+    """
+
+    def __init__(self, app, http_metrics: HttpMetrics, stage_histogram: Histogram, skip_paths: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.metrics = http_metrics
+        self.stage_histogram = stage_histogram
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        stages = RequestStages(self.stage_histogram)
+        token = _current_stages.set(stages)
+        method = scope["method"]
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = stages.server_timing()
+                if header:
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header.encode("latin-1"))]}
+            await send(message)
+
+        self.metrics.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except Exception:
+            status = 500
+            raise
+        finally:
+            self.metrics.in_flight.dec()
+            # The matched route template, not the raw path, keeps label
+            # cardinality bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.metrics.requests.inc(method=method, route=route, status=str(status))
+            if status >= 500:
+                self.metrics.errors.inc(method=method, route=route)
+            self.metrics.duration.observe(time.perf_counter() - start, method=method, route=route)
+            _current_stages.reset(token)
@@ -0,0 +1,121 @@
+"""
+Nutrition gap analysis over food-log histories
+Keyword categories and the flags derived from them are loaded from
+data/nutrition_keywords.json. Each category's keywords are compiled into
+one regex and each distinct food name is matched once, so the cost per
+log is a few dict lookups and months of history analyze in milliseconds.
+"""
+import os
+import re
+import json
+import hashlib
+from collections import Counter
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+# Bumped when categories_for() changes what it matches, so counts stored
+# by the previous matcher are recounted
+MATCHER_VERSION = 2
+
+DEFAULT_KEYWORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "nutrition_keywords.json")
+
+
+class NutritionGapAnalyzer:
+    """Computes the analyze_nutrition_gaps summary for a list of food logs"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.categories: Dict[str, List[str]] = {
+            category: [keyword.lower() for keyword in keywords]
+            for category, keywords in config["categories"].items()
+        }
+        self.flags: Dict[str, Dict[str, Any]] = config.get("flags", {})
+        self.meal_types: List[str] = config.get("meal_types", ["breakfast", "lunch", "dinner", "snack"])
+
+        for flag, rule in self.flags.items():
+            if rule.get("category") not in self.categories:
+                raise ValueError(f"Flag {flag} refers to unknown category {rule.get('category')}")
+            if rule.get("when") not in ("absent", "share_above"):
+                raise ValueError(f"Flag {flag} has unknown rule {rule.get('when')}")
+
+        # One alternation per category: a search finds a match wherever any of
+        # the category's keywords occurs, which is exactly `keyword in name`.
+        # A single alternation over every category would only report one
+        # keyword per position, so "eggplant" would hide "egg".
+        self._category_patterns: Dict[str, "re.Pattern[str]"] = {
+            category: re.compile("|".join(re.escape(keyword) for keyword in keywords))
+            for category, keywords in self.categories.items()
+            if keywords
+        }
+        self._name_categories: Dict[str, FrozenSet[str]] = {}
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_KEYWORDS_PATH) -> "NutritionGapAnalyzer":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def categories_for(self, name: str) -> FrozenSet[str]:
+        """Categories whose keywords appear in a lowercased food name"""
+        found = self._name_categories.get(name)
+        if found is None:
+            found = frozenset(
+                category for category, pattern in self._category_patterns.items() if pattern.search(name)
+            )
+            # Food names repeat heavily across a history; bound the memo anyway
+            if len(self._name_categories) < 100_000:
+                self._name_categories[name] = found
+        return found
+
+    def count(self, food_logs: List[Dict[str, Any]]) -> Tuple[Counter, Counter]:
+        """Logs per meal type and per keyword category"""
+        meal_counts = Counter([log.get('mealType', '') for log in food_logs])
+        name_counts = Counter([log.get('name', '') for log in food_logs])
+
+        category_counts: Counter = Counter()
+        for name, count in name_counts.items():
+            for category in self.categories_for(name.lower()):
+                category_counts[category] += count
+        return meal_counts, category_counts
+
+    def analyze(self, food_logs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Nutrition gap summary, matching the analyze_nutrition_gaps tool output"""
+        # One comprehension per column, counted in C; much cheaper than a
+        # single Python loop updating four accumulators per log
+        total_calories = sum([log.get('calories', 0) for log in food_logs])
+        dates = {log.get('date', '') for log in food_logs}
+        meal_counts, category_counts = self.count(food_logs)
+        return self.summarize(len(food_logs), total_calories, len(dates), meal_counts, category_counts)
+
+    def summarize(self, total_logs: int, total_calories: int, days: int,
+                  meal_counts: Dict[str, int], category_counts: Dict[str, int]) -> Dict[str, Any]:
+        """Gap summary from totals, so stored aggregates (see user_profiles.py)
+        give the same result as analyze() over the logs behind them"""
+        gaps: Dict[str, Any] = {
+            "total_logs": total_logs,
+            "total_calories": total_calories,
+            "avg_daily_calories": total_calories / max(days, 1),
+        }
+        for flag, rule in self.flags.items():
+            matches = category_counts.get(rule["category"], 0)
+            if rule["when"] == "absent":
+                gaps[flag] = matches == 0
+            else:
+                gaps[flag] = matches > total_logs * rule.get("threshold", 0.0)
+        gaps["missing_breakfast"] = meal_counts.get('breakfast', 0) == 0
+        gaps["meal_distribution"] = {meal: meal_counts.get(meal, 0) for meal in self.meal_types}
+        return gaps
+
+    def fingerprint(self) -> str:
+        """Hash of the keyword config; aggregates stored under another
+        config have to be recounted"""
+        config = {"categories": self.categories, "matcher": MATCHER_VERSION}
+        return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+_default_analyzer: Optional[NutritionGapAnalyzer] = None
+
+
+def get_analyzer() -> NutritionGapAnalyzer:
+    """Shared analyzer built from NUTRITION_KEYWORDS_PATH or the bundled file"""
+    global _default_analyzer
+    if _default_analyzer is None:
+        _default_analyzer = NutritionGapAnalyzer.from_file(os.getenv("NUTRITION_KEYWORDS_PATH", DEFAULT_KEYWORDS_PATH))
+    return _default_analyzer
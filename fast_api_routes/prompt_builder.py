@@ -0,0 +1,154 @@
+"""
+Token-budgeted food-log section for recommendation prompts
+The most recent days go in as compact CSV rows, older days collapse to
+one summary line each, and whatever no longer fits the budget is
+dropped oldest-first, so prompt size stays bounded however long the
+history gets. A recent day too long for what is left of the budget keeps
+as many of its rows as fit.
+"""
+import io
+import csv
+import math
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+LOG_COLUMNS = ["date", "mealType", "name", "calories", "quantity"]
+MEAL_ORDER = ["breakfast", "lunch", "dinner", "snack"]
+ROWS_TITLE = "Recent logs (CSV):\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English/JSON)"""
+    return math.ceil(len(text) / 4)
+
+
+def format_rows(logs: List[Dict[str, Any]], header: bool = False) -> str:
+    """CSV rows for logs, in LOG_COLUMNS order"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(LOG_COLUMNS)
+    for log in logs:
+        quantity = log.get("quantity", 1.0)
+        writer.writerow([
+            log.get("date", ""),
+            log.get("mealType", ""),
+            log.get("name", ""),
+            log.get("calories", 0),
+            f"{quantity:g}" if isinstance(quantity, (int, float)) else quantity,
+        ])
+    return buffer.getvalue()
+
+
+def summarize_day(day: str, logs: List[Dict[str, Any]]) -> str:
+    """One line per day: item count, calories, meal mix and foods eaten"""
+    calories = sum(log.get("calories", 0) for log in logs)
+    meals = Counter(log.get("mealType", "") for log in logs)
+    meal_mix = ", ".join(f"{meal} {meals[meal]}" for meal in MEAL_ORDER if meals[meal])
+    foods = ", ".join(OrderedDict.fromkeys(log.get("name", "") for log in logs))
+    return f"{day}: {len(logs)} items, {calories} kcal ({meal_mix}); foods: {foods}\n"
+
+
+def build_log_section(food_logs: List[Dict[str, Any]], token_budget: int, recent_days: int) -> Tuple[str, Dict[str, int]]:
+    """Render food logs for the prompt within token_budget.
+
+    Returns the text and counts of what made it in, for reporting.
+    """
+    by_day: Dict[str, List[Dict[str, Any]]] = {}
+    for log in food_logs:
+        by_day.setdefault(log.get("date", ""), []).append(log)
+
+    days = [(day, len(by_day[day])) for day in sorted(by_day, reverse=True)]
+    return build_day_section(
+        days,
+        lambda day: format_rows(by_day[day]),
+        lambda day: summarize_day(day, by_day[day]),
+        token_budget,
+        recent_days,
+    )
+
+
+def build_day_section(
+    days: List[Tuple[str, int]],
+    rows_for: Callable[[str], str],
+    summary_for: Callable[[str], str],
+    token_budget: int,
+    recent_days: int,
+) -> Tuple[str, Dict[str, int]]:
+    """build_log_section over days given newest first as (day, log count).
+
+    rows_for is only called for the recent_days newest days and summary_for
+    only for days that don't go in as rows, so callers holding per-day
+    summaries (see user_profiles.py) never need the older logs themselves.
+    """
+    header = format_rows([], header=True)
+    used = estimate_tokens(ROWS_TITLE + header)
+    counts = dict(days)
+    row_days: List[str] = []
+    summary_days: List[str] = []
+    rows_by_day: Dict[str, str] = {}
+    summaries: Dict[str, str] = {}
+    in_rows: Dict[str, int] = {}
+    dropped = 0
+    truncated = 0
+    rows_open = True
+
+    # Newest first, so the budget goes to the days that matter most
+    for index, (day, count) in enumerate(days):
+        if index < recent_days and rows_open:
+            rows = rows_for(day)
+            cost = estimate_tokens(rows)
+            if used + cost > token_budget:
+                # The first day that doesn't fit keeps as many of its rows
+                # as do, and is the last in as rows: older days are only
+                # summarized, so the summaries stay ahead of the rows in time
+                rows_open = False
+                kept = rows.splitlines(keepends=True)
+                note = f"({count} more logs from {day} omitted)\n"
+                while kept and used + estimate_tokens("".join(kept)) + estimate_tokens(note) > token_budget:
+                    kept.pop()
+                if kept:
+                    truncated = count - len(kept)
+                    rows = "".join(kept) + f"({truncated} more logs from {day} omitted)\n"
+                    count = len(kept)
+                else:
+                    rows = ""
+                cost = estimate_tokens(rows)
+            if rows:
+                rows_by_day[day] = rows
+                row_days.append(day)
+                in_rows[day] = count
+                used += cost
+                continue
+        # Once a day is dropped every older day goes too, keeping the window contiguous
+        if dropped:
+            dropped += count
+            continue
+        summary = summary_for(day)
+        cost = estimate_tokens(summary)
+        if used + cost <= token_budget:
+            summaries[day] = summary
+            summary_days.append(day)
+            used += cost
+        else:
+            dropped += count
+
+    parts = []
+    if dropped:
+        parts.append(f"({dropped} older logs omitted)\n")
+    if summary_days:
+        parts.append("Earlier days (summarized):\n")
+        parts.extend(summaries[day] for day in reversed(summary_days))
+    if row_days:
+        parts.append(ROWS_TITLE)
+        parts.append(header)
+        parts.extend(rows_by_day[day] for day in reversed(row_days))
+    text = "".join(parts) or "No logs.\n"
+
+    stats = {
+        "prompt_log_tokens_estimate": estimate_tokens(text),
+        "logs_in_prompt": sum(in_rows.values()),
+        "logs_summarized": sum(counts[day] for day in summary_days),
+        "logs_dropped": dropped + truncated,
+    }
+    return text, stats
@@ -0,0 +1,184 @@
+"""
+Recommendation result cache
+Keys are a canonical hash of the request's date, logs and preferences so a
+retried or re-opened request skips the agent run entirely.
+Backends:
+- MemoryCache - in-process LRU with TTL
+- SQLiteCache - on-disk LRU with TTL, survives restarts
+Request handlers use aget/aset, which keep SQLite's I/O off the event loop.
+"""
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+def fingerprint(date: str, logs: List[Dict[str, Any]], preferences: Optional[List[Dict[str, Any]]], salt: str = "") -> str:
+    """Canonical hash of a recommendation request.
+
+    Log order and dict key order don't change the result, so both are
+    normalized before hashing.
+    """
+    canonical_logs = sorted(json.dumps(log, sort_keys=True, separators=(",", ":")) for log in logs)
+    payload = json.dumps(
+        {
+            "date": date,
+            "logs": canonical_logs,
+            "preferences": preferences or [],
+            "salt": salt,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    """In-process LRU cache with per-entry TTL"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.get(key)
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        self.set(key, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class SQLiteCache(MemoryCache):
+    """On-disk LRU cache with per-entry TTL, shared across restarts"""
+
+    def __init__(self, path: str, max_entries: int = 1024, ttl_seconds: float = 3600):
+        super().__init__(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS recommendation_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_recommendation_cache_access ON recommendation_cache (last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM recommendation_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM recommendation_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE recommendation_cache SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO recommendation_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl_seconds, now),
+            )
+            self._conn.execute("DELETE FROM recommendation_cache WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                """DELETE FROM recommendation_cache WHERE key IN (
+                    SELECT key FROM recommendation_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    # Every hit writes last_access and commits, so lookups run in a thread
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self.set, key, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM recommendation_cache")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM recommendation_cache").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["backend"] = "sqlite"
+        stats["path"] = self.path
+        return stats
+
+
+def create_cache(backend: str, max_entries: int, ttl_seconds: float, path: str):
+    """Build the configured cache backend, or None when caching is off"""
+    backend = backend.lower()
+    if backend == "memory":
+        return MemoryCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+    if backend == "sqlite":
+        return SQLiteCache(path, max_entries=max_entries, ttl_seconds=ttl_seconds)
+    if backend in ("none", "off", ""):
+        return None
+    raise ValueError(f"Unknown RECOMMENDATION_CACHE_BACKEND: {backend}")
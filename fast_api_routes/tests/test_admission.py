@@ -0,0 +1,114 @@
+import time
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from admission import BATCH, INTERACTIVE, AdmissionController, Overloaded
+
+
+class UpstreamRateLimited(Exception):
+    """An upstream 429 shaped like groq.RateLimitError"""
+
+    status_code = 429
+
+    def __init__(self, retry_after: str):
+        super().__init__("rate limited")
+        self.response = SimpleNamespace(headers={"retry-after": retry_after})
+
+
+async def settle():
+    """Let queued tasks run up to their next wait"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_interactive_requests_displace_batch_when_full():
+    async def run():
+        controller = AdmissionController(max_concurrent=1, queue_size=1)
+        await controller.acquire(INTERACTIVE)
+        batch = asyncio.create_task(controller.acquire(BATCH))
+        interactive = asyncio.create_task(controller.acquire(INTERACTIVE))
+        await settle()
+
+        with pytest.raises(Overloaded) as shed:
+            await batch
+        assert shed.value.retry_after > 0
+        assert controller.queued == 1 and not interactive.done()
+
+        controller.release()
+        await asyncio.wait_for(interactive, 1)
+        assert controller.active == 1 and controller.queued == 0
+        assert controller.stats()["shed_displaced"] == 1
+
+    asyncio.run(run())
+
+
+def test_full_queue_sheds_with_a_retry_hint():
+    async def run():
+        controller = AdmissionController(max_concurrent=2, queue_size=4)
+        for _ in range(2):
+            await controller.acquire()
+        waiters = [asyncio.create_task(controller.acquire()) for _ in range(4)]
+        await settle()
+
+        with pytest.raises(Overloaded) as shed:
+            await controller.acquire()
+        # Four queued ahead of two slots: two slots' turns
+        assert shed.value.retry_after == controller.retry_hint() == 2.0
+        assert controller.stats()["shed_queue_full"] == 1
+
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+    asyncio.run(run())
+
+
+def test_upstream_retry_after_pauses_the_global_bucket():
+    async def run():
+        controller = AdmissionController(max_concurrent=2, retry_base=0.01, retry_max=0.01)
+        calls = []
+
+        async def flaky():
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                raise UpstreamRateLimited("0.3")
+            return "ok"
+
+        retried = asyncio.create_task(controller.call_with_retry(flaky))
+        await asyncio.sleep(0.05)
+
+        # A free slot, but no run starts until the upstream's Retry-After is up
+        start = time.monotonic()
+        await asyncio.wait_for(controller.acquire(), 1)
+        assert time.monotonic() - start >= 0.2
+
+        assert await retried == "ok"
+        assert calls[1] - calls[0] >= 0.3
+        assert controller.stats()["upstream_retries"] == 1
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiters_release_their_queue_slot():
+    async def run():
+        controller = AdmissionController(max_concurrent=1, queue_size=1)
+        await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await settle()
+        assert controller.queued == 1
+
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert controller.queued == 0
+
+        # The slot is free for the next request, which then gets the run slot
+        replacement = asyncio.create_task(controller.acquire())
+        await settle()
+        assert controller.queued == 1
+        controller.release()
+        await asyncio.wait_for(replacement, 1)
+        assert controller.active == 1 and controller.queued == 0
+
+    asyncio.run(run())
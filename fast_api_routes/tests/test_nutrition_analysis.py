@@ -0,0 +1,47 @@
+import random
+
+from nutrition_analysis import NutritionGapAnalyzer, get_analyzer
+
+OVERLAPPING = {
+    "categories": {
+        "veg": ["eggplant", "plant", "salad"],
+        "protein": ["egg", "bean", "fish"],
+        "snacks": ["fish fry", "chips", "fries"],
+    },
+    "flags": {
+        "missing_vegetables": {"category": "veg", "when": "absent"},
+        "low_protein": {"category": "protein", "when": "absent"},
+        "high_processed": {"category": "snacks", "when": "share_above", "threshold": 0.3},
+    },
+}
+
+
+def substring_categories(analyzer, name):
+    """The baseline semantics: a category matches if any keyword is in the name"""
+    name = name.lower()
+    return frozenset(
+        category for category, keywords in analyzer.categories.items()
+        if any(keyword in name for keyword in keywords)
+    )
+
+
+def test_overlapping_keywords_match_every_category():
+    analyzer = NutritionGapAnalyzer(OVERLAPPING)
+    assert analyzer.categories_for("eggplant curry") == {"veg", "protein"}
+    assert analyzer.categories_for("fish fry") == {"protein", "snacks"}
+
+    gaps = analyzer.analyze([{"name": "Eggplant curry", "calories": 300, "mealType": "lunch", "date": "2026-01-01"}])
+    assert gaps["missing_vegetables"] is False
+    assert gaps["low_protein"] is False
+
+
+def test_categories_agree_with_substring_search():
+    rng = random.Random(0)
+    for config in (OVERLAPPING, {"categories": get_analyzer().categories}):
+        analyzer = NutritionGapAnalyzer(config)
+        keywords = [keyword for words in analyzer.categories.values() for keyword in words]
+        for _ in range(2000):
+            parts = rng.sample(keywords, rng.randint(0, 3)) + rng.sample(["curry", "rice", " ", "x"], 2)
+            rng.shuffle(parts)
+            name = "".join(parts) if rng.random() < 0.5 else " ".join(parts)
+            assert analyzer.categories_for(name) == substring_categories(analyzer, name), name
@@ -0,0 +1,30 @@
+from prompt_builder import build_log_section
+
+
+def day_logs(day, count):
+    return [
+        {"date": day, "mealType": "snack", "name": f"Item {i}", "calories": 100, "quantity": 1.0}
+        for i in range(count)
+    ]
+
+
+def test_newest_day_is_truncated_rather_than_summarized():
+    logs = day_logs("2025-01-01", 3) + day_logs("2025-01-02", 2) + day_logs("2025-01-03", 40)
+    text, stats = build_log_section(logs, token_budget=200, recent_days=3)
+
+    # The newest day keeps the budget, as rows, instead of going in as a
+    # summary ahead of the older days' rows
+    assert "Earlier days" not in text and "2025-01-02," not in text
+    kept = stats["logs_in_prompt"]
+    assert kept > 0 and text.count("2025-01-03,") == kept
+    assert text.endswith(f"({40 - kept} more logs from 2025-01-03 omitted)\n")
+    assert stats["logs_dropped"] == 45 - kept and stats["logs_summarized"] == 0
+
+
+def test_older_days_are_summarized_before_the_rows():
+    logs = day_logs("2025-01-01", 3) + day_logs("2025-01-02", 2) + day_logs("2025-01-03", 2)
+    text, stats = build_log_section(logs, token_budget=2000, recent_days=1)
+
+    summaries, rows = text.split("Recent logs (CSV):\n")
+    assert summaries.index("2025-01-01: 3 items") < summaries.index("2025-01-02: 2 items")
+    assert rows.count("2025-01-03,") == stats["logs_in_prompt"] == 2
@@ -0,0 +1,53 @@
+import os
+import json
+import time
+import asyncio
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+import httpx
+
+import main
+
+LOGS = [
+    {"date": "2025-01-01", "mealType": "lunch", "name": "Dal Rice", "calories": 550, "quantity": 1.0},
+]
+
+
+def stream(body):
+    """Events of one /recommendations/generate_stream call (NDJSON), each
+    with the seconds from the request until it was read"""
+    async def run():
+        events = []
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            start = time.perf_counter()
+            async with client.stream("POST", "/recommendations/generate_stream", json=body) as response:
+                async for line in response.aiter_lines():
+                    if line:
+                        events.append((time.perf_counter() - start, json.loads(line)))
+        return events
+    return asyncio.run(run())
+
+
+def test_agent_stream_stops_generating_after_max_items(monkeypatch):
+    from fake_llm import FakeChatGroq
+
+    # Slow enough per token that generating the answer dominates the run
+    llm = FakeChatGroq(latency_ms=10, jitter_ms=0, ms_per_token=3, tool_rounds=1, seed=1)
+    monkeypatch.setitem(main.agent_state, "llm", llm)
+    monkeypatch.setitem(main.agent_state, "agent", main.create_food_recommendation_agent(llm))
+    body = {"date": "2025-01-02", "logs": LOGS, "mode": "agent", "use_cache": False}
+
+    monkeypatch.setattr(main, "STREAM_MAX_ITEMS", 10)
+    full = stream(body)
+    assert [event["event"] for _, event in full].count("recommendation") == 3
+
+    monkeypatch.setattr(main, "STREAM_MAX_ITEMS", 1)
+    early = stream(body)
+    assert [event["event"] for _, event in early].count("recommendation") == 1
+    assert early[-1][1]["event"] == "done" and early[-1][1]["success"]
+
+    # The answer's tokens were streamed, so closing the stream after the
+    # first item cut generation short rather than waiting for the reply
+    assert early[-1][0] < full[-1][0] * 0.75
@@ -0,0 +1,49 @@
+import os
+import json
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+import main
+from nutrition_analysis import get_analyzer
+
+LOGS = [
+    {"date": "2025-01-01", "mealType": "breakfast", "name": "Egg Bhurji", "calories": 300, "quantity": 1.0},
+    {"date": "2025-01-01", "mealType": "lunch", "name": "Dal Rice", "calories": 550, "quantity": 1.0},
+    {"date": "2025-01-02", "mealType": "snack", "name": "Chips", "calories": 200, "quantity": 1.0},
+]
+
+
+def test_nutrition_gaps_match_analyzer():
+    expected = get_analyzer().analyze(LOGS)
+    assert json.loads(main.compute_nutrition_gaps(LOGS)) == expected
+    assert json.loads(main.RequestHistory(LOGS).nutrition_gaps()) == expected
+    assert json.loads(main.analyze_nutrition_gaps(main.RequestHistory(LOGS))) == expected
+
+
+def test_request_history_analyzes_once(monkeypatch):
+    calls = []
+    analyze = main.compute_nutrition_gaps
+    monkeypatch.setattr(main, "compute_nutrition_gaps", lambda logs: calls.append(logs) or analyze(logs))
+
+    history = main.RequestHistory(LOGS)
+    assert history.nutrition_gaps() == history.nutrition_gaps()
+    assert len(calls) == 1
+
+
+def test_agent_gap_tool_reads_the_request_history():
+    import asyncio
+    from langchain_core.messages import HumanMessage, ToolMessage
+    from fake_llm import FakeChatGroq
+    from usage_tracker import UsageTracker
+    from metrics import RequestStages
+
+    history = main.RequestHistory([dict(LOGS[i % 3], date=f"2025-01-{i // 3 + 1:02d}") for i in range(60)])
+    llm = FakeChatGroq(latency_ms=0, jitter_ms=0, tool_rounds=1, seed=1)
+    agent = main.create_food_recommendation_agent(llm)
+    config = main.agent_config(history, UsageTracker(RequestStages()))
+    # The prompt carries none of the logs; the tool still sees all of them
+    result = asyncio.run(agent.ainvoke({"messages": [HumanMessage(content="prompt")]}, config=config))
+
+    tool_results = [m for m in result["messages"] if isinstance(m, ToolMessage)]
+    assert tool_results[0].name == "analyze_nutrition_gaps"
+    assert json.loads(tool_results[0].content)["total_logs"] == 60
@@ -0,0 +1,82 @@
+import pytest
+
+from nutrition_analysis import get_analyzer
+from user_profiles import ProfileAccessDenied, ProfileStore, ProfileTokenRequired
+
+LOGS = [
+    {"id": "1", "date": "2025-01-01", "mealType": "lunch", "name": "Dal Rice", "calories": 550, "quantity": 1.0},
+    {"id": "2", "date": "2025-01-02", "mealType": "dinner", "name": "Fish Curry", "calories": 600, "quantity": 1.0},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProfileStore(str(tmp_path / "profiles.sqlite3"), get_analyzer())
+
+
+def test_first_sync_issues_a_token_that_guards_the_profile(store):
+    created = store.sync("u1", LOGS[:1])
+    token = created["token"]
+    assert created["revision"] == 1
+
+    with pytest.raises(ProfileTokenRequired):
+        store.sync("u1", LOGS[1:])
+    with pytest.raises(ProfileAccessDenied):
+        store.sync("u1", LOGS[1:], token="guess")
+    with pytest.raises(ProfileAccessDenied):
+        store.sync("u1", [], replace=True, token="guess")
+    with pytest.raises(ProfileTokenRequired):
+        store.snapshot("u1")
+    with pytest.raises(ProfileAccessDenied):
+        store.delete("u1", token="guess")
+
+    synced = store.sync("u1", LOGS[1:], token=token)
+    assert synced["revision"] == 2 and "token" not in synced
+    assert len(store.snapshot("u1", token=token)) == 2
+    assert store.delete("u1", token=token)
+
+    # Deleting the profile frees the user_id, and a new token is issued
+    assert store.sync("u1", LOGS)["token"] != token
+
+
+def test_profiles_without_a_token_are_rejected(store):
+    store.sync("u1", LOGS[:1])
+    with store._conn:
+        store._conn.execute("UPDATE profiles SET token_hash = NULL")
+
+    with pytest.raises(ProfileTokenRequired):
+        store.sync("u1", LOGS[1:])
+    with pytest.raises(ProfileAccessDenied):
+        store.sync("u1", LOGS[1:], token="guess")
+    with pytest.raises(ProfileAccessDenied):
+        store.snapshot("u1", token="guess")
+
+
+def test_profile_routes_check_the_token(store, monkeypatch):
+    import os
+    import asyncio
+
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+    import httpx
+    import main
+
+    monkeypatch.setitem(main.profile_state, "store", store)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            created = await client.post("/profiles/u1/logs", json={"logs": LOGS[:1]})
+            token = created.json()["token"]
+
+            assert (await client.get("/profiles/u1")).status_code == 401
+            assert (await client.get("/profiles/u1", headers={"X-Profile-Token": "guess"})).status_code == 403
+            assert (await client.delete("/profiles/u1")).status_code == 401
+            body = {"date": "2025-01-03", "user_id": "u1", "logs": LOGS[1:], "use_cache": False}
+            assert (await client.post("/recommendations/generate", json=body)).status_code == 401
+            assert (await client.post("/recommendations/generate_stream", json=body)).status_code == 401
+            assert store.snapshot("u1", token=token).revision == 1
+
+            profile = await client.get("/profiles/u1", headers={"X-Profile-Token": token})
+            assert profile.status_code == 200 and profile.json()["logs"] == 1
+
+    asyncio.run(run())
@@ -0,0 +1,93 @@
+"""
+Per-request LLM usage and timing callback
+Kept out of main.py so importing the API doesn't pull in langchain; it is
+imported on the first request.
+"""
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from metrics import Counter, RequestStages
+from prompt_builder import estimate_tokens
+
+
+class UsageTracker(BaseCallbackHandler):
+    """Counts LLM calls and tokens for one request and times each LLM and
+    tool call into the request's stages"""
+
+    run_inline = True
+
+    def __init__(self, stages: RequestStages, token_counter: Optional[Counter] = None):
+        super().__init__()
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.prompt_stats: Dict[str, int] = {}
+        self.stages = stages
+        self.token_counter = token_counter
+        self._started: Dict[Any, Tuple[str, float]] = {}
+
+    def _start(self, run_id, stage: str):
+        self._started[run_id] = (stage, time.perf_counter())
+
+    def _finish(self, run_id):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            stage, start = started
+            self.stages.record(stage, time.perf_counter() - start)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "llm")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "llm")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        self._start(run_id, f"tool.{name}")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def record_prompt(self, prompt: str, log_stats: Dict[str, int]):
+        """Remember the size of the prompt this request sent"""
+        self.prompt_stats = {**log_stats, "prompt_tokens_estimate": estimate_tokens(prompt)}
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        self._finish(run_id)
+        self.llm_calls += 1
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if not usage:
+            for generations in response.generations:
+                for generation in generations:
+                    message = getattr(generation, "message", None)
+                    metadata = getattr(message, "response_metadata", None) or {}
+                    usage = metadata.get("token_usage") or usage
+                    # Streamed replies only carry langchain's usage_metadata
+                    streamed = getattr(message, "usage_metadata", None) or {}
+                    if not usage and streamed:
+                        usage = {"prompt_tokens": streamed.get("input_tokens"),
+                                 "completion_tokens": streamed.get("output_tokens")}
+        prompt_tokens = int(usage.get("prompt_tokens") or 0)
+        completion_tokens = int(usage.get("completion_tokens") or 0)
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        if self.token_counter is not None:
+            self.token_counter.inc(prompt_tokens, kind="prompt")
+            self.token_counter.inc(completion_tokens, kind="completion")
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            **self.prompt_stats,
+        }
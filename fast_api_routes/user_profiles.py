@@ -0,0 +1,343 @@
+"""
+Per-user nutrition profiles, updated incrementally
+Clients send only the logs added since their last sync. A sync stores
+those logs and recounts just the days they touch: calorie and log totals,
+meal-type and keyword-category counts, and the one-line day summary used
+in prompts. A recommendation then reads the rolling window of day
+aggregates plus the logs of the few most recent days, so its cost follows
+the size of the delta and the window rather than the whole history.
+
+Profiles live in one SQLite file (WAL), which the workers on a host share.
+The window is anchored to the user's newest logged day; older days are
+pruned on sync.
+
+The sync that creates a profile returns a random token, and only its
+hash is stored. Every later sync, read or delete of that profile must
+present the token.
+"""
+import hmac
+import json
+import time
+import sqlite3
+import hashlib
+import secrets
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from nutrition_analysis import NutritionGapAnalyzer
+from prompt_builder import build_day_section, format_rows, summarize_day
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS profiles (
+        user_id TEXT PRIMARY KEY,
+        revision INTEGER NOT NULL,
+        updated_at REAL NOT NULL,
+        token_hash TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS profile_logs (
+        user_id TEXT NOT NULL,
+        log_id TEXT NOT NULL,
+        date TEXT NOT NULL,
+        meal_type TEXT NOT NULL,
+        name TEXT NOT NULL,
+        calories INTEGER NOT NULL,
+        quantity REAL NOT NULL,
+        PRIMARY KEY (user_id, log_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_profile_logs_day ON profile_logs (user_id, date)",
+    """CREATE TABLE IF NOT EXISTS profile_days (
+        user_id TEXT NOT NULL,
+        date TEXT NOT NULL,
+        logs INTEGER NOT NULL,
+        calories INTEGER NOT NULL,
+        summary TEXT NOT NULL,
+        PRIMARY KEY (user_id, date)
+    )""",
+    """CREATE TABLE IF NOT EXISTS profile_day_counts (
+        user_id TEXT NOT NULL,
+        date TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        key TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (user_id, date, kind, key)
+    )""",
+    """CREATE TABLE IF NOT EXISTS profile_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )""",
+]
+DAY_TABLES = ("profile_logs", "profile_days", "profile_day_counts")
+
+
+class ProfileAccessDenied(Exception):
+    """A profile read or write with the wrong token"""
+
+    status_code = 403
+
+
+class ProfileTokenRequired(ProfileAccessDenied):
+    status_code = 401
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def check_token(token_hash: Optional[str], token: Optional[str]) -> None:
+    """Raise unless token is the one token_hash was stored for"""
+    if not token:
+        raise ProfileTokenRequired("This profile requires its profile token")
+    if token_hash is None or not hmac.compare_digest(token_hash, hash_token(token)):
+        raise ProfileAccessDenied("Invalid profile token")
+
+
+def log_key(log: Dict[str, Any], seen: Counter) -> str:
+    """Id a log is stored under: the client's id, else a hash of its fields
+    plus its occurrence within the sync. Resending a sync is then a no-op,
+    while two identical entries in one sync are both kept."""
+    if log.get("id"):
+        return f"id:{log['id']}"
+    content = json.dumps(
+        [log.get("date", ""), log.get("mealType", ""), log.get("name", ""), log.get("calories", 0), log.get("quantity", 1.0)],
+        separators=(",", ":"),
+    )
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+    seen[digest] += 1
+    return f"h:{digest}:{seen[digest] - 1}"
+
+
+class ProfileSnapshot:
+    """A user's profile over the rolling window, as read for one request"""
+
+    def __init__(self, user_id: str, revision: Optional[int], window_days: int,
+                 days: List[Tuple[str, int, int, str]], gaps: Dict[str, Any],
+                 recent_logs: Dict[str, List[Dict[str, Any]]], updated_at: Optional[float] = None):
+        self.user_id = user_id
+        self.revision = revision
+        self.window_days = window_days
+        self.days = days  # (date, logs, calories, summary), newest first
+        self.gaps = gaps
+        self.recent_logs = recent_logs
+        self.updated_at = updated_at
+
+    def __len__(self) -> int:
+        return sum(logs for _, logs, _, _ in self.days)
+
+    def log_section(self, token_budget: int, recent_days: int) -> Tuple[str, Dict[str, int]]:
+        """Prompt section like build_log_section; only the days loaded as
+        recent_logs can go in as rows"""
+        return build_day_section(
+            [(day, logs) for day, logs, _, _ in self.days],
+            lambda day: format_rows(self.recent_logs.get(day, [])),
+            {day: summary for day, _, _, summary in self.days}.get,
+            token_budget,
+            min(recent_days, len(self.recent_logs)),
+        )
+
+    def nutrition_gaps(self) -> str:
+        """The analyze_nutrition_gaps output for the window"""
+        return json.dumps(self.gaps, indent=2)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "user_id": self.user_id,
+            "revision": self.revision,
+            "updated_at": self.updated_at,
+            "window_days": self.window_days,
+            "days": len(self.days),
+            "logs": len(self),
+            "first_date": self.days[-1][0] if self.days else None,
+            "last_date": self.days[0][0] if self.days else None,
+            "daily_calories": {day: calories for day, _, calories, _ in reversed(self.days)},
+            "nutrition_gaps": self.gaps,
+        }
+
+
+class ProfileStore:
+    """SQLite-backed per-user profiles with incremental day aggregates"""
+
+    def __init__(self, path: str, analyzer: NutritionGapAnalyzer, window_days: int = 30):
+        self.path = path
+        self.analyzer = analyzer
+        self.window_days = window_days
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            for statement in SCHEMA:
+                self._conn.execute(statement)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(profiles)")}
+            if "token_hash" not in columns:
+                self._conn.execute("ALTER TABLE profiles ADD COLUMN token_hash TEXT")
+        self._check_keywords()
+
+    def _check_keywords(self) -> None:
+        """Recount every stored day if the keyword categories changed since
+        the category counts were written"""
+        fingerprint = self.analyzer.fingerprint()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value FROM profile_meta WHERE key = 'keywords'").fetchone()
+            if row is not None and row[0] == fingerprint:
+                return
+            for user_id, day in self._conn.execute("SELECT DISTINCT user_id, date FROM profile_logs").fetchall():
+                self._recount(user_id, [day])
+            self._conn.execute(
+                "INSERT OR REPLACE INTO profile_meta (key, value) VALUES ('keywords', ?)", (fingerprint,)
+            )
+
+    def _cutoff(self, user_id: str) -> Optional[str]:
+        """Oldest date inside the user's window, or None without a usable date"""
+        newest = self._conn.execute(
+            "SELECT MAX(date) FROM profile_days WHERE user_id = ?", (user_id,)
+        ).fetchone()[0]
+        try:
+            return (date.fromisoformat(newest[:10]) - timedelta(days=self.window_days - 1)).isoformat()
+        except (TypeError, ValueError):
+            return None
+
+    def _recount(self, user_id: str, days) -> None:
+        """Rebuild the aggregates of the given days from their stored logs"""
+        for day in days:
+            rows = self._conn.execute(
+                "SELECT meal_type, name, calories FROM profile_logs WHERE user_id = ? AND date = ? ORDER BY rowid",
+                (user_id, day),
+            ).fetchall()
+            self._conn.execute("DELETE FROM profile_day_counts WHERE user_id = ? AND date = ?", (user_id, day))
+            if not rows:
+                self._conn.execute("DELETE FROM profile_days WHERE user_id = ? AND date = ?", (user_id, day))
+                continue
+            logs = [{"mealType": meal, "name": name, "calories": calories} for meal, name, calories in rows]
+            meal_counts, category_counts = self.analyzer.count(logs)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO profile_days (user_id, date, logs, calories, summary) VALUES (?, ?, ?, ?, ?)",
+                (user_id, day, len(logs), sum(log["calories"] for log in logs), summarize_day(day, logs)),
+            )
+            self._conn.executemany(
+                "INSERT INTO profile_day_counts (user_id, date, kind, key, count) VALUES (?, ?, ?, ?, ?)",
+                [(user_id, day, "meal", meal, count) for meal, count in meal_counts.items()]
+                + [(user_id, day, "category", category, count) for category, count in category_counts.items()],
+            )
+
+    def sync(self, user_id: str, logs: List[Dict[str, Any]], replace: bool = False,
+             token: Optional[str] = None) -> Dict[str, Any]:
+        """Merge new logs into the profile (or replace it) in one transaction.
+        An existing profile needs its token; the sync that creates one
+        returns a new token in the result, the only time it is given out."""
+        seen: Counter = Counter()
+        rows = [
+            (user_id, log_key(log, seen), log.get("date", ""), log.get("mealType", ""), log.get("name", ""),
+             log.get("calories", 0), log.get("quantity", 1.0))
+            for log in logs
+        ]
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT revision, token_hash FROM profiles WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            if row is not None:
+                check_token(row[1], token)
+            if replace:
+                for table in DAY_TABLES:
+                    self._conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+            before = self._conn.total_changes
+            self._conn.executemany(
+                """INSERT OR IGNORE INTO profile_logs (user_id, log_id, date, meal_type, name, calories, quantity)
+                VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                rows,
+            )
+            added = self._conn.total_changes - before
+            if added:
+                self._recount(user_id, {row[2] for row in rows})
+                cutoff = self._cutoff(user_id)
+                if cutoff is not None:
+                    for table in DAY_TABLES:
+                        self._conn.execute(f"DELETE FROM {table} WHERE user_id = ? AND date < ?", (user_id, cutoff))
+
+            revision = row[0] if row is not None else 0
+            issued = None
+            if added or replace:
+                revision += 1
+                if row is None:
+                    issued = secrets.token_urlsafe(32)
+                self._conn.execute(
+                    """INSERT INTO profiles (user_id, revision, updated_at, token_hash) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (user_id) DO UPDATE SET revision = excluded.revision, updated_at = excluded.updated_at,
+                        token_hash = COALESCE(excluded.token_hash, profiles.token_hash)""",
+                    (user_id, revision, time.time(), hash_token(issued) if issued else None),
+                )
+        result = {
+            "user_id": user_id,
+            "revision": revision,
+            "added": added,
+            "duplicates": len(rows) - added,
+        }
+        if issued:
+            result["token"] = issued
+        return result
+
+    def snapshot(self, user_id: str, recent_days: int = 3, token: Optional[str] = None) -> ProfileSnapshot:
+        """The user's window: day aggregates, gap analysis and the logs of
+        the recent_days newest days. revision is None for unknown users."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT revision, updated_at, token_hash FROM profiles WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            if row is not None:
+                check_token(row[2], token)
+            cutoff = self._cutoff(user_id) or ""
+            days = self._conn.execute(
+                "SELECT date, logs, calories, summary FROM profile_days WHERE user_id = ? AND date >= ? ORDER BY date DESC",
+                (user_id, cutoff),
+            ).fetchall()
+            counts = self._conn.execute(
+                """SELECT kind, key, SUM(count) FROM profile_day_counts
+                WHERE user_id = ? AND date >= ? GROUP BY kind, key""",
+                (user_id, cutoff),
+            ).fetchall()
+            recent_logs: Dict[str, List[Dict[str, Any]]] = {}
+            if days and recent_days > 0:
+                oldest_recent = days[:recent_days][-1][0]
+                for day, meal, name, calories, quantity in self._conn.execute(
+                    """SELECT date, meal_type, name, calories, quantity FROM profile_logs
+                    WHERE user_id = ? AND date >= ? ORDER BY date, rowid""",
+                    (user_id, oldest_recent),
+                ):
+                    recent_logs.setdefault(day, []).append(
+                        {"date": day, "mealType": meal, "name": name, "calories": calories, "quantity": quantity}
+                    )
+
+        meal_counts = {key: count for kind, key, count in counts if kind == "meal"}
+        category_counts = {key: count for kind, key, count in counts if kind == "category"}
+        gaps = self.analyzer.summarize(
+            sum(logs for _, logs, _, _ in days),
+            sum(calories for _, _, calories, _ in days),
+            len(days),
+            meal_counts,
+            category_counts,
+        )
+        return ProfileSnapshot(
+            user_id,
+            row[0] if row is not None else None,
+            self.window_days,
+            days,
+            gaps,
+            recent_logs,
+            updated_at=row[1] if row is not None else None,
+        )
+
+    def delete(self, user_id: str, token: Optional[str] = None) -> bool:
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT token_hash FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+            if row is None:
+                return False
+            check_token(row[0], token)
+            for table in DAY_TABLES:
+                self._conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+            return self._conn.execute("DELETE FROM profiles WHERE user_id = ?", (user_id,)).rowcount > 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            users = self._conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+            logs = self._conn.execute("SELECT COUNT(*) FROM profile_logs").fetchone()[0]
+        return {"path": self.path, "window_days": self.window_days, "users": users, "logs": logs}